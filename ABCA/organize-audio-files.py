@@ -1,90 +1,331 @@
 #!/usr/bin/env python3
 
+"""
+Copy the Bible audio files from ROOT/AT and ROOT/NT into ROOT/flat, with flat,
+sequential names.
+
+Files are copied several at a time. A file is skipped if its copy has the same
+size and is at least as new as the original (or, with --verify, has the same
+SHA-256 hash), so partial or outdated copies are redone. Each copy is written
+to a temporary file and renamed into place when complete. With --link, files
+are hard-linked or reflinked (copy-on-write clones) instead of copied when the
+source and flat folders are on the same filesystem.
+
+With --dry-run, nothing is copied; the rename plan (each file's source,
+destination and action) can be written out with --plan for review.
+"""
+
+import argparse
+import csv
+import errno
+import hashlib
+import json
+import os
 import shutil
 import sys
+import time
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'sfm'))
+from books import nt_books, ot_books
+
+# Linux ioctl to clone a file's extents (btrfs, XFS, etc.).
+FICLONE = 0x40049409
+
+# Book code or NT book number -> flat book number, e.g. "GEN" -> "B01" and
+# "B01" (Matthew) -> "B40".
+ot_book_ids = {b.code: b.audio_id for b in ot_books}
+nt_book_ids = {f"B{i:02d}": b.audio_id for i, b in enumerate(nt_books, start=1)}
+
+
+def iter_files(folder, recursive=True):
+    """Yield the paths of the files in (and under) folder, using os.scandir so
+    that each file's type comes from its directory entry, not a stat call.
+    Symlinked folders aren't followed, so a link loop can't recurse forever."""
+    try:
+        entries = list(os.scandir(folder))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            if recursive:
+                yield from iter_files(entry.path)
+        elif entry.is_file():
+            yield Path(entry.path)
+
 
 def convert_file_paths(files, testament=None):
     """Convert file paths to the correct flat, sequential format.
 
     I.e. "./B0#___##_Book_name____SAGCAR.mp3"
-    """
-
-    ot_book_abbrevs = [
-        "GEN", "EXO", "LEV", "NUM", "DEU",
-        "JOS", "JDG", "RUT", "1SA", "2SA",
-        "1KI", "2KI", "1CH", "2CH", "EZR",
-        "NEH", "EST", "JOB", "PSA", "PRO",
-        "ECC", "SNG", "ISA", "JER", "LAM",
-        "EZK", "DAN", "HOS", "JOL", "AMO",
-        "OBA", "JON", "MIC", "NAM", "HAB",
-        "ZEP", "HAG", "ZEC", "MAL",
-    ]
-
-    nt_book_idxs = {}
-    ct = 0
-    for n in range(40, 67):
-        ct += 1
-        nt_book_idxs[f"B{ct:02d}"] = f"B{n}"
-
-    ct = 0
-    ot_book_idxs = {}
-    for bk in ot_book_abbrevs:
-        ct += 1
-        ot_book_idxs[bk] = f"B{ct:02d}"
 
+    Files whose names don't match the expected pattern are reported and left
+    out.
+    """
     new_names = []
-    if testament.lower() == 'old':
-        for fp in files:
-            suf = fp.suffix
-            nam, cha = fp.stem.split('_')
-            new_name = f"{ot_book_idxs.get(nam)}___{cha}_{nam}____SAGCAR{suf}"
-            new_names.append((fp, new_name))
-    elif testament.lower() == 'new':
-        for fp in files:
-            nbk = fp.name.split('___')[0]
-            new_name = fp.name.replace(nbk, nt_book_idxs.get(nbk))
-            new_names.append((fp, new_name))
-
+    for fp in files:
+        new_name = None
+        if testament.lower() == 'old':
+            # e.g. "GEN_01.mp3"
+            nam, _, cha = fp.stem.partition('_')
+            if nam in ot_book_ids and cha:
+                new_name = f"{ot_book_ids[nam]}___{cha}_{nam}____SAGCAR{fp.suffix}"
+        elif testament.lower() == 'new':
+            # e.g. "B01___01_Matthieu____SAGCAR.mp3", numbered from Matthew
+            nbk, sep, rest = fp.name.partition('___')
+            if nbk in nt_book_ids and sep:
+                new_name = f"{nt_book_ids[nbk]}{sep}{rest}"
+        if new_name is None:
+            print(f"Warning: Unrecognized file name, skipped: {fp}", file=sys.stderr)
+            continue
+        new_names.append((fp, new_name))
     return new_names
 
 
-def ensure_file_copy(outdir, conversions):
+def get_conflicts(conversions):
+    """Return {new name: [source, ...]} for each name that more than one file
+    would be copied to."""
+    sources = {}
     for op, nn in conversions:
+        sources.setdefault(nn, []).append(op)
+    return {nn: ops for nn, ops in sources.items() if len(ops) > 1}
+
+
+def get_plan(outdir, conversions, verify=False):
+    """Return the rename plan: a dict of source, destination and action for
+    each file, where action is "copy", "skip" (already up to date) or
+    "conflict" (another file has the same destination)."""
+    plan = []
+    seen = set()
+    for op, nn in sorted(conversions, key=lambda c: c[1]):
         np = outdir / nn
-        if not np.is_file():
-            print(f"{op} > {np}...")
-            shutil.copy(op, np)
+        if np in seen:
+            action = 'conflict'
+        elif is_up_to_date(op, np, verify):
+            action = 'skip'
+        else:
+            action = 'copy'
+        seen.add(np)
+        plan.append({'source': str(op), 'destination': str(np), 'action': action})
+    return plan
+
+
+def write_plan(plan, dest):
+    """Write the plan as CSV if dest ends in .csv, otherwise as JSON; "-"
+    means stdout."""
+    f = sys.stdout if dest == '-' else open(dest, 'w', newline='', encoding='utf-8')
+    try:
+        if str(dest).lower().endswith('.csv'):
+            writer = csv.DictWriter(f, fieldnames=('source', 'destination', 'action'))
+            writer.writeheader()
+            writer.writerows(plan)
+        else:
+            json.dump(plan, f, indent=2, ensure_ascii=False)
+            f.write('\n')
+    finally:
+        if f is not sys.stdout:
+            f.close()
+
+
+def get_hash(path, chunk_size=1024 * 1024):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def is_up_to_date(op, np, verify=False):
+    """Return True if np is already a complete copy of op."""
+    try:
+        nstat = np.stat()
+    except FileNotFoundError:
+        return False
+    ostat = op.stat()
+    if (nstat.st_dev, nstat.st_ino) == (ostat.st_dev, ostat.st_ino): # hard link
+        return True
+    if nstat.st_size != ostat.st_size:
+        return False
+    if verify:
+        return get_hash(op) == get_hash(np)
+    return nstat.st_mtime >= ostat.st_mtime
+
+
+def reflink(op, tmp):
+    if fcntl is None:
+        raise OSError(errno.ENOTSUP, "Reflinks aren't supported on this system")
+    with open(op, 'rb') as src, open(tmp, 'wb') as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    shutil.copystat(op, tmp)
+
+
+def copy_file(op, np, link=None):
+    """Copy, hard-link or reflink op to np by way of a temporary file; fall
+    back to copying if linking isn't possible. Returns the method used."""
+    tmp = np.with_name(f".{np.name}.part")
+    tmp.unlink(missing_ok=True) # left over from an interrupted run
+    method = 'copied'
+    try:
+        if link == 'hard':
+            try:
+                os.link(op, tmp)
+                method = 'hard-linked'
+            except OSError as e:
+                if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+                    raise
+        elif link == 'reflink':
+            try:
+                reflink(op, tmp)
+                method = 'reflinked'
+            except OSError:
+                tmp.unlink(missing_ok=True)
+        if method == 'copied':
+            shutil.copy2(op, tmp)
+        os.replace(tmp, np)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return method
+
+
+def show_progress(done, total, nbytes, start, end='\r'):
+    elapsed = time.perf_counter() - start
+    rate = nbytes / elapsed / 1e6 if elapsed else 0
+    print(f"{done}/{total} files, {nbytes / 1e6:.1f} MB, {rate:.1f} MB/s", end=end, file=sys.stderr, flush=True)
+
+
+def ensure_file_copy(outdir, conversions, jobs=8, link=None, verify=False, verbose=False):
+    """Copy the files that aren't already up to date in outdir, several at a
+    time, and report progress and throughput. Returns a dict of counts."""
+    counts = {'copied': 0, 'hard-linked': 0, 'reflinked': 0, 'skipped': 0, 'failed': 0}
+
+    def process(op, np):
+        if is_up_to_date(op, np, verify):
+            return 'skipped', 0
+        return copy_file(op, np, link), op.stat().st_size
+
+    conversions = list(conversions)
+    nbytes = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(process, op, outdir / nn): (op, outdir / nn) for op, nn in conversions}
+        for i, future in enumerate(as_completed(futures), start=1):
+            op, np = futures[future]
+            try:
+                method, size = future.result()
+            except OSError as e:
+                print(f"\nError: {op} > {np}: {e}", file=sys.stderr)
+                counts['failed'] += 1
+                continue
+            counts[method] += 1
+            nbytes += size
+            if verbose and method != 'skipped':
+                print(f"{op} > {np} ({method})")
+            if i == len(conversions):
+                show_progress(i, len(conversions), nbytes, start, end='\n')
+            elif sys.stderr.isatty():
+                show_progress(i, len(conversions), nbytes, start)
+    return counts
 
 
 def main():
     # Handle commandline.
-    if len(sys.argv) < 2:
-        print("Error: Need to pass root directory as 1st argument")
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "root_dir",
+        help="the folder containing the AT and NT folders",
+    )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=8,
+        help="number of files to copy at the same time (default: 8)",
+    )
+    parser.add_argument(
+        "-l", "--link",
+        choices=["hard", "reflink"],
+        help="hard-link or reflink files instead of copying them where possible",
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="compare SHA-256 hashes, not just sizes and times, to find changed files",
+    )
+    parser.add_argument(
+        "-v", "--verbose",
+        action="store_true",
+        help="list each file copied",
+    )
+    parser.add_argument(
+        "-n", "--dry-run",
+        action="store_true",
+        help="only work out what would be copied; don't copy anything",
+    )
+    parser.add_argument(
+        "--plan",
+        metavar="FILE",
+        help="write the rename plan to FILE as JSON, or as CSV if FILE ends in .csv (\"-\" for stdout)",
+    )
+    args = parser.parse_args()
+    root_dir = Path(args.root_dir)
+    if not root_dir.is_dir():
+        print(f"Error: Not a valid directory: {root_dir}")
         exit(1)
-    elif sys.argv[1] == '-h' or sys.argv[1] == '--help':
-        print(f"Usage: {sys.argv[0]} /AUDIO/FILE/ROOT/DIR")
-        exit()
-    else:
-        root_dir = Path(sys.argv[1])
-        if not root_dir.is_dir():
-            print(f"Error: Not a valid directory: {root_dir}")
-            exit(1)
 
     ot_dir = root_dir / 'AT'
     nt_dir = root_dir / 'NT'
     out_dir = root_dir / 'flat'
-    out_dir.mkdir(parents=True, exist_ok=True)
 
     # Begin processing.
-    ot_files = (f for f in ot_dir.rglob('*') if f.is_file())
+    start = time.perf_counter()
+    ot_files = iter_files(ot_dir)
     ot_conversions = convert_file_paths(ot_files, testament='old')
-    ensure_file_copy(out_dir, ot_conversions)
 
-    nt_files = nt_dir.iterdir()
+    nt_files = iter_files(nt_dir, recursive=False)
     nt_conversions = convert_file_paths(nt_files, testament='new')
-    ensure_file_copy(out_dir, nt_conversions)
+
+    if args.dry_run or args.plan:
+        plan = get_plan(out_dir, ot_conversions + nt_conversions, verify=args.verify)
+        elapsed = time.perf_counter() - start
+        if args.plan:
+            write_plan(plan, args.plan)
+        elif args.verbose:
+            for p in plan:
+                print(f"{p['action']}: {p['source']} > {p['destination']}")
+        counts = {}
+        for p in plan:
+            counts[p['action']] = counts.get(p['action'], 0) + 1
+        summary = ', '.join(f"{n} {k}" for k, n in counts.items())
+        print(f"Plan: {summary or 'no files'} ({elapsed:.2f} s)", file=sys.stderr)
+        if args.dry_run:
+            return
+
+    # Files copied to the same name at the same time would share a temporary
+    # file.
+    conflicts = get_conflicts(ot_conversions + nt_conversions)
+    if conflicts:
+        for nn, ops in sorted(conflicts.items()):
+            print(f"Error: {', '.join(map(str, ops))} would all be copied to {out_dir / nn}", file=sys.stderr)
+        exit(1)
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+    counts = ensure_file_copy(
+        out_dir, ot_conversions + nt_conversions,
+        jobs=args.jobs, link=args.link, verify=args.verify, verbose=args.verbose,
+    )
+    elapsed = time.perf_counter() - start
+    summary = ', '.join(f"{n} {k}" for k, n in counts.items() if n)
+    print(f"{summary or 'no files'} in {elapsed:.2f} s")
+    if counts['failed']:
+        exit(1)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+
+"""
+Convert PDFs of Action Bible pages to a video.
+- Each video frame is 2 opposing pages from the Action Bible.
+- Each frame is visible for a reasonable amount of time so that the text can
+  be read.
+
+The PDFs' names give the range of pages they hold, e.g. "…-12-24.pdf". Pages
+are rasterized (pdftoppm) and paired into frames (montage) several at a time,
+in DST_DIR/pages and DST_DIR/frames. A page or frame is only made again if
+it's older than what it's made from, so a rerun after changing one PDF only
+redoes that PDF's pages and frames. The frames are then listed in
+DST_DIR/frames/list.txt for ffmpeg's concat demuxer and encoded to
+DST_DIR/video.mp4.
+
+Needs poppler-utils (pdfinfo, pdftoppm), ImageMagick (montage) and ffmpeg.
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+DELAY = 60 # seconds per frame
+HEIGHT = 1080 # pixels
+
+
+def get_page_count(pdf):
+    r = subprocess.run(['pdfinfo', str(pdf)], capture_output=True, text=True, check=True)
+    m = re.search(r'^Pages:\s+(\d+)', r.stdout, re.MULTILINE)
+    return int(m.group(1)) if m else 0
+
+
+def get_page_jobs(src_dir, pages_dir):
+    """Return (pdf, page in PDF, page file) for each page of each PDF, where
+    the page file is numbered from the start of the PDF's page range."""
+    jobs = []
+    for pdf in sorted(src_dir.glob('*.pdf')):
+        m = re.search(r'(\d+)-\d+', pdf.name)
+        if not m:
+            print(f"Warning: No page range in file name, skipped: {pdf.name}", file=sys.stderr)
+            continue
+        start = int(m.group(1))
+        for rel_pg in range(1, get_page_count(pdf) + 1):
+            pg = start + rel_pg - 1
+            jobs.append((pdf, rel_pg, pages_dir / f"{pg:03d}-pdf.jpg"))
+    return jobs
+
+
+def get_frame_jobs(page_files, frames_dir):
+    """Return (left page, right page, frame file) for each odd page and the
+    even page after it."""
+    pages = {int(p.name.split('-')[0]): p for p in page_files}
+    jobs = []
+    for pg in sorted(pages):
+        if pg % 2 == 1 and pg + 1 in pages:
+            jobs.append((pages[pg], pages[pg + 1], frames_dir / f"frame-{(pg + 1) // 2:03d}.jpg"))
+    return jobs
+
+
+def is_up_to_date(outfile, *infiles):
+    try:
+        mtime = outfile.stat().st_mtime
+    except FileNotFoundError:
+        return False
+    return all(mtime >= f.stat().st_mtime for f in infiles)
+
+
+def make_page(pdf, rel_pg, page_file):
+    # Write to a temporary name so an interrupted run leaves no partial page.
+    tmp = page_file.with_name(f".{page_file.stem}.part")
+    subprocess.run(
+        ['pdftoppm', '-f', str(rel_pg), '-l', str(rel_pg), '-jpeg', '-singlefile', str(pdf), str(tmp)],
+        check=True, capture_output=True,
+    )
+    os.replace(tmp.with_name(f"{tmp.name}.jpg"), page_file)
+
+
+def make_frame(left, right, frame_file):
+    tmp = frame_file.with_name(f".{frame_file.name}.part")
+    subprocess.run(
+        ['montage', str(left), str(right), '-tile', '2x1', '-geometry', '+10+10', f"jpg:{tmp}"],
+        check=True, capture_output=True,
+    )
+    os.replace(tmp, frame_file)
+
+
+def run_stage(name, func, jobs, workers, force=False):
+    """Run func(*job) for each job whose output (its last item) isn't up to
+    date with its input files, several at a time. Returns the number made."""
+    start = time.perf_counter()
+    todo = [
+        j for j in jobs
+        if force or not is_up_to_date(j[-1], *(a for a in j[:-1] if isinstance(a, Path)))
+    ]
+    print(f"{name}: {len(todo)} to make, {len(jobs) - len(todo)} up to date", end='', flush=True)
+    failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(func, *j): j for j in todo}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except subprocess.CalledProcessError as e:
+                print(f"\nError: {futures[future][-1].name}: {e.stderr.decode(errors='replace').strip() or e}", file=sys.stderr)
+                failed += 1
+                continue
+            print('.', end='', flush=True)
+    print(f" ({time.perf_counter() - start:.2f} s)")
+    if failed:
+        print(f"Error: {failed} {name.lower()} failed", file=sys.stderr)
+        exit(1)
+    return len(todo)
+
+
+def write_concat_list(frame_files, list_file, delay):
+    """Write the ffmpeg concat list, unless it's unchanged; returns True if it
+    was written."""
+    lines = ["ffconcat version 1.0"]
+    for f in frame_files:
+        lines.append(f"file '{f.name}'")
+        lines.append(f"duration {delay}")
+    if frame_files:
+        # The concat demuxer ignores the last duration unless the last file
+        # is repeated.
+        lines.append(f"file '{frame_files[-1].name}'")
+    text = '\n'.join(lines) + '\n'
+    if list_file.is_file() and list_file.read_text() == text:
+        return False
+    list_file.write_text(text)
+    return True
+
+
+def make_video(list_file, outfile, height):
+    subprocess.run(
+        [
+            'ffmpeg', '-y', '-f', 'concat', '-i', str(list_file),
+            '-vf', f"scale=-2:{height},format=yuv420p", '-vsync', 'vfr', str(outfile),
+        ],
+        check=True, capture_output=True,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "src_dir",
+        nargs='?',
+        default=Path.home(),
+        help="the folder containing the PDFs (default: home folder)",
+    )
+    parser.add_argument(
+        "dst_dir",
+        nargs='?',
+        help="the folder for the pages, frames and video (default: SRC_DIR)",
+    )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="number of pages or frames to make at the same time (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "-d", "--delay",
+        type=int,
+        default=DELAY,
+        help=f"seconds per frame (default: {DELAY})",
+    )
+    parser.add_argument(
+        "--height",
+        type=int,
+        default=HEIGHT,
+        help=f"video height in pixels (default: {HEIGHT})",
+    )
+    parser.add_argument(
+        "-f", "--force",
+        action="store_true",
+        help="make all pages, frames and the video again, even if up to date",
+    )
+    args = parser.parse_args()
+    src_dir = Path(args.src_dir)
+    dst_dir = Path(args.dst_dir) if args.dst_dir else src_dir
+    pages_dir = dst_dir / 'pages'
+    frames_dir = dst_dir / 'frames'
+    pages_dir.mkdir(parents=True, exist_ok=True)
+    frames_dir.mkdir(parents=True, exist_ok=True)
+    # Each job is its own process; keep ImageMagick from also using every core.
+    os.environ.setdefault('MAGICK_THREAD_LIMIT', '1')
+
+    total_start = time.perf_counter()
+
+    # Convert each PDF to a series of JPGs.
+    page_jobs = get_page_jobs(src_dir, pages_dir)
+    run_stage("Pages", make_page, page_jobs, args.jobs, args.force)
+
+    # Concatenate every pair of images.
+    frame_jobs = get_frame_jobs([j[-1] for j in page_jobs], frames_dir)
+    made = run_stage("Frames", make_frame, frame_jobs, args.jobs, args.force)
+
+    # String images together into MP4.
+    start = time.perf_counter()
+    frame_files = [j[-1] for j in frame_jobs]
+    if not frame_files:
+        print("Error: No frames to make a video from.", file=sys.stderr)
+        exit(1)
+    list_file = frames_dir / 'list.txt'
+    changed = write_concat_list(frame_files, list_file, args.delay)
+    outfile = dst_dir / 'video.mp4'
+    if args.force or made or changed or not is_up_to_date(outfile, list_file):
+        try:
+            make_video(list_file, outfile, args.height)
+        except subprocess.CalledProcessError as e:
+            print(f"Error: ffmpeg: {e.stderr.decode(errors='replace').strip()}", file=sys.stderr)
+            exit(1)
+        print(f"Video: {len(frame_files)} frames ({time.perf_counter() - start:.2f} s)")
+    else:
+        print("Video: up to date")
+    print(f"{outfile} ({time.perf_counter() - total_start:.2f} s)")
+
+
+if __name__ == '__main__':
+    main()
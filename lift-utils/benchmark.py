@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+"""
+Compare streaming LIFT parsing (lift.iter_entries) with loading the whole
+tree, using the Banda-Linda sample repeated to simulate a large export.
+"""
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+from pathlib import Path
+
+from lift import iter_entries
+
+here = Path(__file__).resolve().parent
+sample = here / 'data' / 'Banda-Linda-sample.lift'
+
+
+def make_scaled_lift(outfile, scale):
+    """Write the sample's header and then its entries `scale` times."""
+    text = sample.read_text()
+    start = text.index('<entry ')
+    end = text.rindex('</lift>')
+    header, entries = text[:start], text[start:end]
+    with open(outfile, 'w') as f:
+        f.write(header)
+        for i in range(scale):
+            # Keep guids unique across the copies.
+            f.write(entries.replace('guid="', f'guid="{i:04d}-'))
+        f.write('</lift>\n')
+
+def measure(func, path):
+    # Memory tracing slows parsing down a lot, so time a separate run.
+    start = time.perf_counter()
+    count = func(path)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func(path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return count, elapsed, peak
+
+def count_streamed(path):
+    ct = 0
+    for entry in iter_entries(path):
+        ct += 1
+    return ct
+
+def count_full_tree(path):
+    return len(ET.parse(path).getroot().findall('entry'))
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument(
+        "-s", "--scales",
+        type=lambda s: [int(n) for n in s.split(',')],
+        default=[1, 10, 50],
+        help="comma-separated number of copies of the sample's entries (default: 1,10,50)",
+    )
+    p.add_argument(
+        "--no-tree",
+        action="store_true",
+        help="skip the full-tree comparison",
+    )
+    args = p.parse_args()
+
+    print(f"{'scale':>6} {'MB':>7} {'entries':>9} {'method':<7} {'seconds':>8} {'MB/s':>7} {'peak MB':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scales:
+            path = Path(tmp) / f"sample-x{scale}.lift"
+            make_scaled_lift(path, scale)
+            size = path.stat().st_size / 1e6
+            methods = {'stream': count_streamed}
+            if not args.no_tree:
+                methods['tree'] = count_full_tree
+            for name, func in methods.items():
+                count, elapsed, peak = measure(func, path)
+                print(
+                    f"{scale:>5}x {size:>7.1f} {count:>9} {name:<7} "
+                    f"{elapsed:>8.2f} {size / elapsed:>7.1f} {peak / 1e6:>8.1f}"
+                )
+            path.unlink()
+
+if __name__ == '__main__':
+    main()
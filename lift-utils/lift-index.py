@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+
+"""
+Build an SQLite index of a LIFT file and query it without reparsing the XML.
+
+    lift-index.py build data/Banda-Linda-sample.lift
+    lift-index.py query data/Banda-Linda-sample.lift --gloss "tante paternelle"
+    lift-index.py query data/Banda-Linda-sample.lift --domain 4.1.9
+    lift-index.py query data/Banda-Linda-sample.lift --search "oncle OR tante"
+    lift-index.py query data/Banda-Linda-sample.lift --search "tant*"
+
+The index is kept next to the LIFT file (NAME.lift.sqlite). On rebuild, only
+entries whose content has changed are reindexed, and entries no longer in the
+LIFT file are removed.
+"""
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import sys
+import time
+
+from pathlib import Path
+
+from lift import iter_entries
+
+# Bump this when the schema changes; older indexes are then rebuilt.
+INDEX_VERSION = 2
+
+index_schema = """
+CREATE TABLE IF NOT EXISTS entries (
+    guid TEXT PRIMARY KEY,
+    headword TEXT,
+    date_modified TEXT,
+    hash TEXT,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS entries_headword ON entries (headword);
+CREATE TABLE IF NOT EXISTS glosses (
+    guid TEXT,
+    lang TEXT,
+    gloss TEXT
+);
+CREATE INDEX IF NOT EXISTS glosses_gloss ON glosses (gloss);
+CREATE INDEX IF NOT EXISTS glosses_guid ON glosses (guid);
+CREATE TABLE IF NOT EXISTS domains (
+    guid TEXT,
+    domain TEXT
+);
+CREATE INDEX IF NOT EXISTS domains_domain ON domains (domain);
+CREATE INDEX IF NOT EXISTS domains_guid ON domains (guid);
+"""
+# Each entry's row has the same rowid as in entries.
+fts_schema = """
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5 (
+    headword, glosses, definitions
+);
+"""
+
+
+def get_index_file(lift_file):
+    lift_file = Path(lift_file)
+    return lift_file.with_name(f"{lift_file.name}.sqlite")
+
+def open_index(index_file):
+    con = sqlite3.connect(index_file)
+    if con.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+        con.executescript("""
+            DROP TABLE IF EXISTS entries;
+            DROP TABLE IF EXISTS glosses;
+            DROP TABLE IF EXISTS domains;
+            DROP TABLE IF EXISTS entries_fts;
+        """)
+        con.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+    con.executescript(index_schema)
+    try:
+        con.executescript(fts_schema)
+    except sqlite3.OperationalError: # SQLite built without FTS5
+        pass
+    return con
+
+def has_fts(con):
+    row = con.execute("SELECT name FROM sqlite_master WHERE name = 'entries_fts'").fetchone()
+    return row is not None
+
+def delete_entry(con, guid, fts):
+    if fts:
+        # By rowid, as the guid isn't indexed in entries_fts.
+        con.execute("DELETE FROM entries_fts WHERE rowid = (SELECT rowid FROM entries WHERE guid = ?)", (guid,))
+    con.execute("DELETE FROM entries WHERE guid = ?", (guid,))
+    con.execute("DELETE FROM glosses WHERE guid = ?", (guid,))
+    con.execute("DELETE FROM domains WHERE guid = ?", (guid,))
+
+def get_hash(data):
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+def get_entry_key(entry, data):
+    """Return the entry's guid or, if it has none, a hash of its content, so
+    that it's keyed the same way each time the index is updated."""
+    if entry.guid:
+        return entry.guid
+    return 'sha1:' + get_hash(data)
+
+def add_entry(con, key, entry, data, fts):
+    cur = con.execute(
+        "INSERT INTO entries VALUES (?, ?, ?, ?, ?)",
+        (key, entry.headword, entry.date_modified, get_hash(data), data)
+    )
+    con.executemany(
+        "INSERT INTO glosses VALUES (?, ?, ?)",
+        ((key, lang, gloss) for s in entry.senses for lang, gloss in s.glosses.items())
+    )
+    con.executemany(
+        "INSERT INTO domains VALUES (?, ?)",
+        ((key, d) for s in entry.senses for d in s.semantic_domains)
+    )
+    if fts:
+        con.execute(
+            "INSERT INTO entries_fts (rowid, headword, glosses, definitions) VALUES (?, ?, ?, ?)",
+            (
+                cur.lastrowid,
+                ' '.join(entry.forms.values()),
+                ' '.join(entry.get_glosses()),
+                ' '.join(d for s in entry.senses for d in s.definitions.values()),
+            )
+        )
+
+def build_index(lift_file, index_file, rebuild=False):
+    """Add new or modified entries to the index and drop removed ones.
+
+    Returns the numbers of entries (re)indexed, unchanged and removed.
+    """
+    con = open_index(index_file)
+    fts = has_fts(con)
+    # Compare content rather than dateModified, which not every entry has.
+    indexed = dict(con.execute("SELECT guid, hash FROM entries"))
+    seen = set()
+    updated = unchanged = 0
+    with con:
+        for entry in iter_entries(lift_file):
+            data = json.dumps(entry.to_dict(), ensure_ascii=False)
+            key = get_entry_key(entry, data)
+            if key in seen: # a duplicate of an entry without a guid
+                continue
+            seen.add(key)
+            if not rebuild and key in indexed and indexed[key] == get_hash(data):
+                unchanged += 1
+                continue
+            if key in indexed:
+                delete_entry(con, key, fts)
+            add_entry(con, key, entry, data, fts)
+            updated += 1
+        removed = [guid for guid in indexed if guid not in seen]
+        for guid in removed:
+            delete_entry(con, guid, fts)
+    con.close()
+    return updated, unchanged, len(removed)
+
+def get_fts_query(search):
+    """Quote each term of the search as an FTS5 string, so that words with
+    apostrophes, hyphens or quotes are searched for as they are. The AND, OR
+    and NOT operators and a trailing * (prefix search) are kept."""
+    terms = []
+    for term in search.split():
+        if term in ('AND', 'OR', 'NOT'):
+            terms.append(term)
+            continue
+        prefix = term.endswith('*') and len(term) > 1
+        if prefix:
+            term = term[:-1]
+        term = '"' + term.replace('"', '""') + '"'
+        terms.append(f"{term} *" if prefix else term)
+    return ' '.join(terms)
+
+def query_index(con, headword=None, gloss=None, guid=None, domain=None, search=None):
+    """Return (headword, data dict) for each matching entry."""
+    conditions = []
+    params = []
+    if headword:
+        conditions.append("headword = ?")
+        params.append(headword)
+    if guid:
+        conditions.append("guid = ?")
+        params.append(guid)
+    if gloss:
+        conditions.append("guid IN (SELECT guid FROM glosses WHERE gloss = ?)")
+        params.append(gloss)
+    if domain:
+        # Domains are stored like "4.1.9.1.6 Oncle, tante"; match by prefix.
+        conditions.append("guid IN (SELECT guid FROM domains WHERE domain LIKE ? ESCAPE '\\')")
+        params.append(domain.replace('%', '\\%').replace('_', '\\_') + '%')
+    if search:
+        if has_fts(con):
+            conditions.append("rowid IN (SELECT rowid FROM entries_fts WHERE entries_fts MATCH ?)")
+            params.append(get_fts_query(search))
+        else:
+            conditions.append("(headword LIKE ? OR guid IN (SELECT guid FROM glosses WHERE gloss LIKE ?))")
+            params.extend([f"%{search}%"] * 2)
+    sql = "SELECT headword, data FROM entries"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY headword"
+    return [(headword, json.loads(data)) for headword, data in con.execute(sql, params)]
+
+def show_entry(headword, entry):
+    glosses = '; '.join(g for s in entry['senses'] for g in s['glosses'].values())
+    domains = ', '.join(v for s in entry['senses'] for n, v in s['traits'] if n.startswith('semantic-domain'))
+    line = f"{headword}\t{glosses}"
+    if domains:
+        line += f"\t({domains})"
+    print(f"{line}\t[{entry['guid']}]")
+
+def main():
+    p = argparse.ArgumentParser()
+    sub = p.add_subparsers(dest='command', required=True)
+    b = sub.add_parser('build', help="create or update the index of a LIFT file")
+    b.add_argument("lift_file", help="the LIFT file to index")
+    b.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="reindex all entries, not just modified ones",
+    )
+    q = sub.add_parser('query', help="look up entries in a LIFT file's index")
+    q.add_argument("lift_file", help="the indexed LIFT file")
+    q.add_argument("-w", "--headword", help="exact headword")
+    q.add_argument("-g", "--gloss", help="exact gloss, in any language")
+    q.add_argument("-u", "--guid", help="entry guid")
+    q.add_argument("-d", "--domain", help="semantic domain, e.g. \"4.1.9\"")
+    q.add_argument("-s", "--search", help="full-text search of headwords, glosses and definitions")
+    args = p.parse_args()
+
+    lift_file = Path(args.lift_file)
+    index_file = get_index_file(lift_file)
+
+    if args.command == 'build':
+        if not lift_file.is_file():
+            print(f"Error: Not a file: {lift_file}")
+            exit(1)
+        start = time.perf_counter()
+        updated, unchanged, removed = build_index(lift_file, index_file, rebuild=args.rebuild)
+        elapsed = time.perf_counter() - start
+        print(f"{updated} entries indexed, {unchanged} unchanged, {removed} removed in {elapsed:.2f} s")
+        print(f"{index_file} ({index_file.stat().st_size / 1024:.0f} KiB)")
+        return 0
+
+    if not index_file.is_file():
+        print(f"Error: No index for {lift_file}; run \"{p.prog} build {lift_file}\" first.")
+        exit(1)
+    con = sqlite3.connect(index_file)
+    try:
+        results = query_index(
+            con,
+            headword=args.headword,
+            gloss=args.gloss,
+            guid=args.guid,
+            domain=args.domain,
+            search=args.search,
+        )
+    except sqlite3.OperationalError as e:
+        print(f"Error: {e}")
+        exit(1)
+    for headword, entry in results:
+        show_entry(headword, entry)
+    print(f"{len(results)} entries", file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    main()
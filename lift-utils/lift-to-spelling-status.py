@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+
+"""
+Merge the words of a LIFT lexicon into a Paratext SpellingStatus.xml file.
+
+    lift-to-spelling-status.py data/Banda-Linda-sample.lift ~/Paratext8Projects/PROJ/SpellingStatus.xml
+
+Every word of every lexical-unit, citation and variant form in the vernacular
+writing system is added as an approved ("R") word, unless the SpellingStatus
+file already has it. Existing Status elements, including their State,
+Correction and SpecificCase, are copied through unchanged and in their
+original order; new words are appended after them.
+"""
+
+import argparse
+import os
+import regex as re
+import sys
+import tempfile
+import time
+import unicodedata
+import xml.etree.ElementTree as ET
+
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from lift import iter_entries
+
+# Morph types of bound forms that can't appear as words on their own.
+affix_types = {
+    'circumfix', 'infix', 'prefix', 'simulfix', 'suffix', 'suprafix',
+    'infixing interfix', 'prefixing interfix', 'suffixing interfix',
+    'bound root', 'bound stem', 'proclitic', 'enclitic',
+}
+# Words include combining marks, which \w alone doesn't match (e.g. the
+# circumflex of ɔ̂, which has no precomposed form).
+word_re = re.compile(r"[\w\p{M}][\w\p{M}'’-]*")
+
+
+def get_lift_words(lift_file, lang=None):
+    """Return the set of words found in the LIFT file's forms for the given
+    language (or the first lexical-unit language found), and that language."""
+    words = set()
+    for entry in iter_entries(lift_file):
+        if any(n == 'morph-type' and v in affix_types for n, v in entry.traits):
+            continue
+        if lang is None:
+            lang = next(iter(entry.forms), None)
+        for forms in (entry.forms, entry.citations, *entry.variants):
+            text = forms.get(lang)
+            if text:
+                words.update(w.rstrip('-') for w in word_re.findall(text))
+    return words, lang
+
+def get_newline(path):
+    with open(path, 'rb') as f:
+        return '\r\n' if b'\r\n' in f.readline() else '\n'
+
+def escape_attr(value):
+    return escape(value, {'"': '&quot;'})
+
+def format_status(word, state='R', correction=None, specific_case=None):
+    attrs = f'Word="{escape_attr(word)}" State="{escape_attr(state)}"'
+    children = []
+    if correction is not None:
+        children.append(f"    <Correction>{escape(correction)}</Correction>")
+    if specific_case is not None:
+        children.append(f"    <SpecificCase>{escape(specific_case)}</SpecificCase>")
+    if not children:
+        return [f"  <Status {attrs} />"]
+    return [f"  <Status {attrs}>", *children, "  </Status>"]
+
+def iter_status(status_file):
+    """Yield (word, state, correction, specific_case) for each Status element,
+    clearing each one from the tree once it's been read."""
+    root = None
+    for event, elem in ET.iterparse(status_file, events=('start', 'end')):
+        if root is None:
+            root = elem
+        if event != 'end' or elem.tag != 'Status':
+            continue
+        yield (
+            elem.get('Word'),
+            elem.get('State'),
+            elem.findtext('Correction'),
+            elem.findtext('SpecificCase'),
+        )
+        root.clear()
+
+def get_word_forms(lift_words):
+    """Map each word, lower-cased as Paratext stores it, to the form to give as
+    its SpecificCase, or None if it's all lower-case."""
+    word_forms = {}
+    for w in lift_words:
+        w = unicodedata.normalize('NFC', w)
+        lower = w.lower()
+        if lower not in word_forms or w == lower:
+            word_forms[lower] = w if w != lower else None
+    return dict(sorted(word_forms.items()))
+
+def iter_merged_lines(status_file, word_forms, counts):
+    """Yield the lines of the merged SpellingStatus file: the existing Status
+    elements first, then one for each word of word_forms not already there.
+    Words found are removed from word_forms, leaving only the new ones.
+
+    Words are compared in NFC, but new words are written in NFD if the
+    existing file uses it.
+    """
+    counts.update(existing=0, known=0, added=0)
+    unicode_form = 'NFC'
+
+    yield '﻿<?xml version="1.0" encoding="utf-8"?>'
+    yield "<SpellingStatus>"
+    if status_file is not None:
+        for word, state, correction, specific_case in iter_status(status_file):
+            counts['existing'] += 1
+            key = unicodedata.normalize('NFC', word)
+            if key != word:
+                unicode_form = 'NFD'
+            if key in word_forms:
+                del word_forms[key]
+                counts['known'] += 1
+            yield from format_status(word, state, correction, specific_case)
+    for word, form in word_forms.items():
+        counts['added'] += 1
+        if unicode_form == 'NFD':
+            word = unicodedata.normalize('NFD', word)
+            form = form and unicodedata.normalize('NFD', form)
+        yield from format_status(word, specific_case=form)
+    yield "</SpellingStatus>"
+
+def write_lines(lines, outfile, newline='\r\n'):
+    """Write the lines to a temporary file and then move it into place."""
+    outfile = Path(outfile)
+    fd, tmp = tempfile.mkstemp(dir=outfile.parent, prefix=f".{outfile.name}.")
+    try:
+        with open(fd, 'w', encoding='utf-8', newline='') as f:
+            f.writelines(line + newline for line in lines)
+        if outfile.exists():
+            os.chmod(tmp, outfile.stat().st_mode)
+        os.replace(tmp, outfile)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("lift_file", help="the LIFT file to take words from")
+    p.add_argument(
+        "status_file",
+        help="the SpellingStatus.xml file to update; it's created if it doesn't exist",
+    )
+    p.add_argument(
+        "-l", "--lang",
+        help="the vernacular writing system (default: the first one used for lexical-units)",
+    )
+    p.add_argument(
+        "-o", "--output",
+        help="write the merged file here instead of updating status_file",
+    )
+    p.add_argument(
+        "-n", "--dry-run",
+        action="store_true",
+        help="list the words that would be added without writing anything",
+    )
+    args = p.parse_args()
+
+    lift_file = Path(args.lift_file)
+    status_file = Path(args.status_file)
+    if not lift_file.is_file():
+        print(f"Error: Not a file: {lift_file}")
+        exit(1)
+
+    start = time.perf_counter()
+    lift_words, lang = get_lift_words(lift_file, args.lang)
+    if not lift_words:
+        print(f"Error: No \"{lang}\" words found in {lift_file}")
+        exit(1)
+    existing = status_file if status_file.is_file() else None
+
+    counts = {}
+    word_forms = get_word_forms(lift_words)
+    lines = iter_merged_lines(existing, word_forms, counts)
+    if args.dry_run:
+        for line in lines: # leaves only the new words in word_forms
+            pass
+        for word, form in word_forms.items():
+            print(form or word)
+    else:
+        newline = get_newline(existing) if existing else '\r\n'
+        write_lines(lines, args.output or status_file, newline)
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"{len(lift_words)} \"{lang}\" words in {lift_file.name}: "
+        f"{counts['known']} already in {status_file.name}, {counts['added']} added "
+        f"({counts['existing']} existing words kept) in {elapsed:.2f} s",
+        file=sys.stderr
+    )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Streaming reader for LIFT 0.13 lexicon files, e.g.:
+    from lift import iter_entries
+    for entry in iter_entries('data/Banda-Linda-sample.lift'):
+        print(entry.headword, entry.get_glosses('fr'))
+
+Entries are parsed one at a time and then discarded, so memory use doesn't
+grow with the size of the file.
+"""
+
+import xml.etree.ElementTree as ET
+
+
+class Sense:
+    __slots__ = ('id', 'grammatical_info', 'glosses', 'definitions', 'traits')
+
+    def __init__(self, id=None):
+        self.id = id
+        self.grammatical_info = None
+        self.glosses = {} # lang: text
+        self.definitions = {} # lang: text
+        self.traits = [] # (name, value)
+
+    @property
+    def semantic_domains(self):
+        return [v for n, v in self.traits if n.startswith('semantic-domain')]
+
+    def to_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    def __repr__(self):
+        return f"Sense({self.id!r}, glosses={self.glosses!r})"
+
+
+class Entry:
+    __slots__ = (
+        'id', 'guid', 'date_created', 'date_modified', 'order',
+        'forms', 'citations', 'variants', 'traits', 'senses',
+    )
+
+    def __init__(self, id=None, guid=None, date_created=None, date_modified=None, order=None):
+        self.id = id
+        self.guid = guid
+        self.date_created = date_created
+        self.date_modified = date_modified
+        self.order = order # homograph number
+        self.forms = {} # lexical-unit; lang: text
+        self.citations = {} # citation forms; lang: text
+        self.variants = [] # variant forms; {lang: text} for each variant
+        self.traits = [] # (name, value)
+        self.senses = []
+
+    @property
+    def headword(self):
+        """The first citation form, or else the first lexical-unit form."""
+        for forms in (self.citations, self.forms):
+            for text in forms.values():
+                return text
+        return None
+
+    def get_glosses(self, lang=None):
+        """All sense glosses, or only those in the given language."""
+        if lang:
+            return [s.glosses[lang] for s in self.senses if lang in s.glosses]
+        return [g for s in self.senses for g in s.glosses.values()]
+
+    def to_dict(self):
+        d = {k: getattr(self, k) for k in self.__slots__}
+        d['senses'] = [s.to_dict() for s in self.senses]
+        return d
+
+    def __repr__(self):
+        return f"Entry({self.headword!r}, guid={self.guid!r})"
+
+
+def get_text(elem):
+    # <text> may contain <span> elements, so gather all its text.
+    text_elem = elem.find('text')
+    if text_elem is None:
+        return ''
+    return ''.join(text_elem.itertext())
+
+def get_forms(elem, tag='form'):
+    return {f.get('lang'): get_text(f) for f in elem.iterfind(tag)}
+
+def get_traits(elem):
+    return [(t.get('name'), t.get('value')) for t in elem.iterfind('trait')]
+
+def make_sense(elem):
+    sense = Sense(elem.get('id'))
+    gram = elem.find('grammatical-info')
+    if gram is not None:
+        sense.grammatical_info = gram.get('value')
+    sense.glosses = get_forms(elem, 'gloss')
+    definition = elem.find('definition')
+    if definition is not None:
+        sense.definitions = get_forms(definition)
+    sense.traits = get_traits(elem)
+    return sense
+
+def make_entry(elem):
+    entry = Entry(
+        id=elem.get('id'),
+        guid=elem.get('guid'),
+        date_created=elem.get('dateCreated'),
+        date_modified=elem.get('dateModified'),
+        order=elem.get('order'),
+    )
+    lexical_unit = elem.find('lexical-unit')
+    if lexical_unit is not None:
+        entry.forms = get_forms(lexical_unit)
+    citation = elem.find('citation')
+    if citation is not None:
+        entry.citations = get_forms(citation)
+    entry.variants = [v for v in (get_forms(e) for e in elem.iterfind('variant')) if v]
+    entry.traits = get_traits(elem)
+    entry.senses = [make_sense(s) for s in elem.iterfind('sense')]
+    return entry
+
+def iter_entries(source, include_deleted=False):
+    """Yield an Entry for each <entry> in a LIFT file (path or binary file
+    object), clearing each element from the tree once it's been read."""
+    root = None
+    for event, elem in ET.iterparse(source, events=('start', 'end')):
+        if root is None:
+            root = elem
+        if event != 'end' or elem.tag != 'entry':
+            continue
+        if include_deleted or elem.get('dateDeleted') is None:
+            yield make_entry(elem)
+        # Drop this and any earlier siblings (e.g. the header) from the tree.
+        root.clear()
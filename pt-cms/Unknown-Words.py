@@ -0,0 +1,17 @@
+import os
+import sys
+
+# Paratext gives the script Project and SettingsDirectory.
+sys.path.insert(0, os.path.join(SettingsDirectory, 'cms'))
+from pt_project import get_project
+
+project = get_project(Project, SettingsDirectory)
+status = project.spelling_status
+counts = {}
+for code in project.book_codes:
+    for word, n in project.word_counts(code).items():
+        if status.check(word) is None:
+            counts[word] = counts.get(word, 0) + n
+
+for word, n in sorted(counts.items(), key=lambda item: (-item[1], item[0])):
+    sys.stdout.write(u'%s\t%d\n' % (word, n))
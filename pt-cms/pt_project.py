@@ -0,0 +1,247 @@
+"""
+Cached access to the current project's settings, books and SpellingStatus for
+Paratext CMS scripts, which are given the globals Project (the project's short
+name) and SettingsDirectory (the Paratext projects folder):
+    import os, sys
+    sys.path.insert(0, os.path.join(SettingsDirectory, 'cms'))
+    from pt_project import get_project
+    project = get_project(Project, SettingsDirectory)
+    project.settings['FullName']
+    project.book_codes              # ['GEN', ..., 'REV'], those present
+    project.get_book_file('MAT')    # e.g. ".../PROJ/41MATPROJ.SFM"
+    project.word_counts('MAT')      # {word: count}, in lower case and NFC
+    project.spelling_status.check('ndeke')
+
+Nothing is read until it's asked for. Whatever is parsed is pickled in
+SettingsDirectory/_pt-cms-cache/PROJECT and kept in memory, and is reparsed
+only when its file's size or modification time changes, so a check run
+repeatedly, in the same interpreter or not, only reparses what was edited.
+
+Like Test.py, this is kept to what runs on both Python 2 (the IronPython that
+hosts CMS scripts) and Python 3, and it uses only the standard library, so it
+can be copied into the cms folder on its own.
+"""
+
+import io
+import os
+import re
+import unicodedata
+import xml.etree.ElementTree as ET
+
+from collections import Counter
+
+try:
+    import cPickle as pickle
+except ImportError: # Python 3
+    import pickle
+
+try:
+    text_type = unicode
+except NameError: # Python 3
+    text_type = str
+
+# Bump this when the format of anything cached changes.
+CACHE_VERSION = 2
+
+book_codes = (
+    'GEN', 'EXO', 'LEV', 'NUM', 'DEU', 'JOS', 'JDG', 'RUT', '1SA', '2SA',
+    '1KI', '2KI', '1CH', '2CH', 'EZR', 'NEH', 'EST', 'JOB', 'PSA', 'PRO',
+    'ECC', 'SNG', 'ISA', 'JER', 'LAM', 'EZK', 'DAN', 'HOS', 'JOL', 'AMO',
+    'OBA', 'JON', 'MIC', 'NAM', 'HAB', 'ZEP', 'HAG', 'ZEC', 'MAL',
+    'MAT', 'MRK', 'LUK', 'JHN', 'ACT', 'ROM', '1CO', '2CO', 'GAL', 'EPH',
+    'PHP', 'COL', '1TH', '2TH', '1TI', '2TI', 'TIT', 'PHM', 'HEB', 'JAS',
+    '1PE', '2PE', '1JN', '2JN', '3JN', 'JUD', 'REV',
+)
+# Paratext numbers the books' files from 01 (GEN), skipping 40, so that
+# Matthew is 41.
+paratext_ids = dict((code, '%02d' % (n if n <= 39 else n + 1)) for n, code in enumerate(book_codes, start=1))
+
+# As in sfm/usfm.py and sfm/spelling.py: a marker (with the number of a \c or
+# \v), and a word, which may contain medial apostrophes and hyphens and
+# combining marks (listed, as re's \w doesn't match them).
+marker_re = re.compile(r"\\(\+?[A-Za-z0-9-]+\*?|\*)(?:(?<=\\[cv])[ \t]+[^\s\\]+)?")
+marks = u"\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f"
+word_re = re.compile(u"[\\w%s]+(?:['\u2019-][\\w%s]+)*" % (marks, marks), re.UNICODE)
+# Markers whose content isn't text to be checked.
+skip_markers = set(['id', 'ide', 'rem', 'h', 'toc1', 'toc2', 'toc3', 'fr', 'xo'])
+
+# Projects already opened in this interpreter.
+_projects = {}
+
+
+def get_project(project, settings_dir):
+    """Return the ProjectData for the short name, reusing it if it's already
+    been opened in this interpreter."""
+    key = (project, settings_dir)
+    if key not in _projects:
+        _projects[key] = ProjectData(project, settings_dir)
+    return _projects[key]
+
+
+def get_file_key(path):
+    stat = os.stat(path)
+    return (CACHE_VERSION, stat.st_mtime, stat.st_size)
+
+
+def replace_file(src, dst):
+    try:
+        os.replace(src, dst)
+    except AttributeError: # Python 2 can't rename over a file on Windows
+        if os.path.exists(dst):
+            os.remove(dst)
+        os.rename(src, dst)
+
+
+def load_cached(cache_file, source, build):
+    """Return build(source), from cache_file if it was saved from the current
+    version of source; otherwise build it and save it to cache_file.
+
+    Returns (key, value), where key identifies the version of source.
+    """
+    key = get_file_key(source)
+    try:
+        with open(cache_file, 'rb') as f:
+            cached_key, value = pickle.load(f)
+        if cached_key == key:
+            return key, value
+    except (IOError, OSError, EOFError, ValueError, AttributeError, pickle.UnpicklingError):
+        pass # missing, from an older version or damaged: rebuild it
+    value = build(source)
+    cache_dir = os.path.dirname(cache_file)
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    tmp = cache_file + '.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump((key, value), f, pickle.HIGHEST_PROTOCOL)
+    replace_file(tmp, cache_file)
+    return key, value
+
+
+def read_settings(path):
+    """Return the top-level elements of Settings.xml as a dict of strings."""
+    root = ET.parse(path).getroot()
+    return dict((elem.tag, elem.text or '') for elem in root)
+
+
+def normalize_word(word):
+    # Python 2's ElementTree gives ASCII text as str.
+    return unicodedata.normalize('NFC', text_type(word)).lower()
+
+
+def get_words(text):
+    """Return the words of a piece of text, leaving out numbers and USFM 3
+    attributes (after a "|")."""
+    text = text.partition('|')[0]
+    return [w for w in word_re.findall(text) if not w.isdigit()]
+
+
+def count_words(book_file):
+    """Return {word: count} for the text of the book, with the words in lower
+    case (as spell-check.py compares them) and NFC."""
+    counts = Counter()
+    marker = None
+    with io.open(book_file, encoding='utf-8-sig') as f:
+        for line in f:
+            start = 0
+            for m in marker_re.finditer(line):
+                if marker not in skip_markers:
+                    counts.update(get_words(line[start:m.start()]))
+                marker = m.group(1)
+                start = m.end()
+            if marker not in skip_markers:
+                counts.update(get_words(line[start:]))
+    words = {}
+    for word, n in counts.items():
+        word = normalize_word(word)
+        words[word] = words.get(word, 0) + n
+    return words
+
+
+class SpellingStatus(object):
+    """The approved and wrong words of a SpellingStatus.xml file, in lower
+    case and NFC (see sfm/spelling.py)."""
+
+    def __init__(self, approved=(), wrong=()):
+        self.approved = frozenset(approved)
+        self.wrong = frozenset(wrong)
+
+    @classmethod
+    def load(cls, path):
+        approved = []
+        wrong = []
+        for elem in ET.parse(path).getroot().iter('Status'):
+            word = normalize_word(elem.get('Word', ''))
+            state = elem.get('State')
+            if state == 'R':
+                approved.append(word)
+            elif state == 'W':
+                wrong.append(word)
+        return cls(approved, wrong)
+
+    def check(self, word):
+        """Return 'R' if the word is approved, 'W' if it's marked as wrong, or
+        None if it's unknown."""
+        word = normalize_word(word)
+        if word in self.approved:
+            return 'R'
+        if word in self.wrong:
+            return 'W'
+        return None
+
+
+class ProjectData(object):
+    def __init__(self, project, settings_dir):
+        self.name = project
+        self.settings_dir = settings_dir
+        self.dir = os.path.join(settings_dir, project)
+        self.cache_dir = os.path.join(settings_dir, '_pt-cms-cache', project)
+        self._memo = {} # name: (file key, value)
+
+    def _get(self, name, source, build):
+        """Return build(source) from memory, then the disk cache, if source
+        hasn't changed since."""
+        key = get_file_key(source)
+        memo = self._memo.get(name)
+        if memo and memo[0] == key:
+            return memo[1]
+        key, value = load_cached(os.path.join(self.cache_dir, name + '.pickle'), source, build)
+        self._memo[name] = (key, value)
+        return value
+
+    @property
+    def settings(self):
+        settings_file = os.path.join(self.dir, 'Settings.xml')
+        if not os.path.isfile(settings_file):
+            return {}
+        return self._get('Settings', settings_file, read_settings)
+
+    def get_book_file(self, code):
+        """Return the path of the book's file, named as in Settings.xml (by
+        default e.g. "41MATPROJ.SFM")."""
+        settings = self.settings
+        form = settings.get('FileNameBookNameForm') or '41MAT'
+        if form == 'MAT':
+            name = code
+        elif form == '41':
+            name = paratext_ids[code]
+        else:
+            name = paratext_ids[code] + code
+        pre = settings.get('FileNamePrePart', '')
+        post = settings.get('FileNamePostPart') or self.name + '.SFM'
+        return os.path.join(self.dir, pre + name + post)
+
+    @property
+    def book_codes(self):
+        """The codes of the books the project has files for, in canonical
+        order."""
+        return [code for code in book_codes if os.path.isfile(self.get_book_file(code))]
+
+    def word_counts(self, code):
+        return self._get(code + '.words', self.get_book_file(code), count_words)
+
+    @property
+    def spelling_status(self):
+        status_file = os.path.join(self.dir, 'SpellingStatus.xml')
+        if not os.path.isfile(status_file):
+            return SpellingStatus()
+        return self._get('SpellingStatus', status_file, SpellingStatus.load)
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+
+"""
+Time the right-choices substitution pipelines on synthetic English and Sango
+lesson text at several sizes.
+
+Results can be saved to a JSON file and compared with a later run to catch
+regressions:
+    ./benchmark.py --save before.json
+    ./benchmark.py --compare before.json
+"""
+
+import argparse
+import importlib.util
+import json
+import random
+import time
+
+from pathlib import Path
+
+here = Path(__file__).resolve().parent
+
+words = {
+    'en': "the choice is right when we follow God and love our friends at school even if they laugh".split(),
+    'sg': "soro ye ti mbirimbiri ayeke nzoni tongana e mu peko ti Nzapa na e ye amba ti e".split(),
+}
+# Heading strings are shared with clean-up-sfm.py.
+headings = json.loads((here / 'headings.json').read_text())
+
+
+def sentence(rng, lang, n=12):
+    s = ' '.join(rng.choice(words[lang]) for i in range(n))
+    return s[0].upper() + s[1:] + '.'
+
+def make_lesson(rng, lang, n):
+    situation, memory, think, how, prayer, read = (
+        headings[k][lang] for k in ('situation', 'memory_verse', 'think', 'how', 'prayer', 'read')
+    )
+    # Paragraphs are broken mid-sentence as they are when scraped from the PDF.
+    return (
+        f"\\c {n}\n"
+        f"{sentence(rng, lang, 4)}\n\n"
+        f"{situation}\n\n{sentence(rng, lang)}\n\n"
+        f"{sentence(rng, lang)} {sentence(rng, lang, 6)[:-1]}\n\n{sentence(rng, lang)}\n\n"
+        f"• {sentence(rng, lang, 6)[:-1]},\n\n{sentence(rng, lang, 4)}\n"
+        f"• {sentence(rng, lang, 8)}\n\n"
+        f"{memory}\n\n{sentence(rng, lang)}\n(Luc 15:{n})\n\n"
+        f"{n * 2}\n\n"
+        f"{think}\n\n{sentence(rng, lang)} {sentence(rng, lang)}\n\n"
+        f"{how}\n\n{sentence(rng, lang)}\n\n"
+        f"{prayer}\n\n{sentence(rng, lang)}\n\n"
+        # Headings partway through a line, and without the closing quote, are
+        # marked too.
+        f"{sentence(rng, lang, 4)[:-1]} {prayer} {sentence(rng, lang, 4)}\n\n"
+        f"{how.replace('’', '')}\n\n{sentence(rng, lang)}\n\n"
+        f"{read}\n\n(Luc 15:1-{n})\n\n"
+    )
+
+def make_text(scale, lessons_per_scale=10, seed=1):
+    """Return a bilingual book with a table of contents and
+    lessons_per_scale * scale lessons in each language."""
+    rng = random.Random(seed)
+    parts = []
+    for lang in ['en', 'sg']:
+        contents, choices = headings['contents'][lang], headings['choices'][lang]
+        n_lessons = lessons_per_scale * scale
+        toc = ''.join(
+            f"{sentence(rng, lang, 3)[:-1]} ....... {i + 1}\n\n{sentence(rng, lang, 6)}\n\n"
+            for i in range(n_lessons)
+        )
+        parts.append(f"\n\n{contents}\n\n{toc}\n{choices}\n\n")
+        parts.extend(make_lesson(rng, lang, i + 1) for i in range(n_lessons))
+    parts.append("\n\nDottie & Josh McDowell\n")
+    return ''.join(parts)
+
+def load_script(name):
+    spec = importlib.util.spec_from_file_location(name.replace('-', '_'), here / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def run(scales, top):
+    scripts = {
+        'clean-up-text': load_script('clean-up-text'),
+        'text2sfm': load_script('text2sfm'),
+        'clean-up-sfm': load_script('clean-up-sfm'),
+    }
+    results = {}
+    print(f"{'scale':>6} {'chars':>10} {'clean-up-text':>14} {'text2sfm':>14} {'clean-up-sfm':>14}")
+    for scale in scales:
+        text = make_text(scale)
+        times = {}
+        all_stats = {}
+        for name, module in scripts.items():
+            convert = module.clean_text if name == 'clean-up-text' else module.convert_text
+            stats = {} if name == 'clean-up-sfm' else []
+            start = time.perf_counter()
+            convert(text, stats)
+            times[name] = time.perf_counter() - start
+            all_stats[name] = stats if isinstance(stats, dict) else {'main': stats}
+        results[str(scale)] = times
+        print(f"{scale:>5}x {len(text):>10} " + ' '.join(f"{t:>13.3f}s" for t in times.values()))
+
+    # List the slowest stages at the largest scale.
+    slowest = []
+    for name, stats in all_stats.items():
+        module = scripts[name]
+        if name == 'clean-up-sfm':
+            pipelines = {
+                'main': module.get_pipeline(module.load_headings()),
+                'toc': module.toc_pipeline,
+            }
+        else:
+            pipelines = {'main': module.pipeline}
+        for k, stage_stats in stats.items():
+            for stage, (ct, secs) in zip(pipelines[k].stages, stage_stats):
+                slowest.append((secs, ct, name, stage.description))
+    slowest.sort(reverse=True)
+    print(f"\nSlowest stages at {scales[-1]}x:")
+    print(f"{'seconds':>9} {'matches':>8}  stage")
+    for secs, ct, name, description in slowest[:top]:
+        print(f"{secs:>9.3f} {ct:>8}  {name}: {description}")
+    return results
+
+def compare(results, baseline, tolerance):
+    regressions = 0
+    print(f"\nCompared with baseline (tolerance {tolerance:.2f}x):")
+    for scale, times in results.items():
+        for name, secs in times.items():
+            before = baseline.get(scale, {}).get(name)
+            if not before:
+                continue
+            ratio = secs / before
+            flag = ''
+            if ratio > tolerance:
+                flag = '  REGRESSION'
+                regressions += 1
+            print(f"{scale:>5}x {name:<14} {before:>8.3f}s -> {secs:>8.3f}s ({ratio:.2f}x){flag}")
+    return regressions
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument(
+        "-s", "--scales",
+        type=lambda s: [int(n) for n in s.split(',')],
+        default=[1, 10, 100],
+        help="comma-separated text sizes, as multiples of 10 lessons per language (default: 1,10,100)",
+    )
+    p.add_argument(
+        "-n", "--top",
+        type=int,
+        default=10,
+        help="number of slowest stages to list",
+    )
+    p.add_argument(
+        "--save",
+        help="save timings to this JSON file",
+    )
+    p.add_argument(
+        "--compare",
+        help="compare timings with those saved in this JSON file",
+    )
+    p.add_argument(
+        "--tolerance",
+        type=float,
+        default=1.5,
+        help="slowdown ratio above which a timing counts as a regression (default: 1.5)",
+    )
+    args = p.parse_args()
+
+    results = run(args.scales, args.top)
+    if args.save:
+        Path(args.save).write_text(json.dumps(results, indent=2))
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        if compare(results, baseline, args.tolerance):
+            exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -1,106 +1,205 @@
 #!/usr/bin/env python3
 
+import argparse
+import json
 import regex as re
 # import re # look-behind requires fixed-width pattern
 import sys
 
+from functools import partial
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'text'))
+from regex_pipeline import Pipeline, Stage
 
-contents = {
-    'en': "Contents",
-    'sg': "Atënë kue ti mbeti ni",
-}
-choices = {
-    'en': "Choices",
-    'sg': "Asorongo-ye",
-}
-situation = {
-    'en': "A Situation and a Choice:",
-    'sg': "Soro oko na popo ni:",
-}
-memory_verse = {
-    'en': "Memory Verse:",
-    'sg': "Bata sura so na li ti mo:",
-}
-think = {
-    'en': "Think and Explore:",
-    'sg': "Gbu li ti mo na mo gi ndani:",
-}
-how = {
-    'en': "How Should I Live Out the ‘Right Choice’?",
-    'sg': "Na lege nye si mbi lingbi soro ye ti Mbirimbiri?",
-}
-prayer = {
-    'en': "Prayer:",
-    'sg': "Sambela:",
-}
-read = {
-    'en': "Read the Story in Your Bible:",
-    'sg': "Diko mbaye ni na ya ti mbeti ti Nzapa ti mo:",
+# Heading strings for each language are kept in headings.json.
+headings_file = Path(__file__).resolve().parent / 'headings.json'
+
+# SFM markers put before a heading line, keyed by heading type.
+heading_markers = {
+    'situation': '\\s2 ',
+    'memory_verse': '\\s2 ',
+    'think': '\\p\n\\v 5 ',
+    'how': '\\p\n\\v 6 ',
+    'prayer': '\\p\n\\v 7 ',
+    'read': '\\p\n\\v 8 ',
 }
 
-def handle_toc_text(m):
-    ttext = m.group(0)
-    # Mark each entry line as a new paragraph and a verse.
-    ttext = re.sub(r'(.*\.+\s*\d+)', r'\\ip \1', ttext)
-    # Mark each description line as a new paragraph.
-    ttext = re.sub(r'(.*\.+\s*\d+\n\n)', r'\1\\ip ', ttext)
-    # Remove blank lines.
-    ttext = re.sub(r'\n\n', r'\n', ttext)
-    return ttext
+
+def load_headings(path=headings_file):
+    return json.loads(Path(path).read_text())
+
+
+class LessonTokenizer:
+    """Mark up a lesson's lines in a single pass.
+
+    All heading strings of all languages are recognized anywhere in a line by
+    one combined matcher, with a named group for each heading type; each
+    heading then marks its neighbouring lines (summary, memory verse, etc.) as
+    verses. As before, heading strings are regular expressions, so e.g. the
+    "’?" in "‘Right Choice’?" makes the closing quote optional.
+    """
+    def __init__(self, headings):
+        groups = []
+        for kind in heading_markers:
+            alternatives = sorted(headings.get(kind, {}).values(), key=len, reverse=True)
+            if alternatives:
+                groups.append(f"(?P<{kind}>{'|'.join(alternatives)})")
+        self.heading_re = re.compile('|'.join(groups))
+        self.p_re = re.compile(r'[\pL“(]')
+        self.kind_order = {kind: i for i, kind in enumerate(heading_markers)}
+
+    def mark(self, ltext):
+        # Mark the Section Headers and drop the blank line after each.
+        lines = []
+        original_lines = ltext.split('\n')
+        skip = False
+        for i, line in enumerate(original_lines):
+            if skip:
+                skip = False
+                continue
+            if (
+                i > 0 and original_lines[i-1].startswith('\\c')
+                and i+2 < len(original_lines) and original_lines[i+1] == ''
+            ):
+                line = f"\\s1 {line}"
+                skip = True
+            lines.append(line)
+        prefixes = [''] * len(lines)
+        n = len(lines)
+
+        def add(i, prefix):
+            # Later marks go in front of earlier ones on the same line.
+            if 0 < i < n:
+                prefixes[i] = prefix + prefixes[i]
+
+        for i, line in enumerate(lines):
+            # Mark list items.
+            if i > 0 and line.startswith('•'):
+                add(i, '\\li1 ')
+
+        # Find all headings, then mark them type by type. A heading partway
+        # through a line gets its marker inserted where it starts.
+        found = []
+        for i, line in enumerate(lines):
+            for m in self.heading_re.finditer(line):
+                found.append((self.kind_order[m.lastgroup], i, m.start(), m))
+        found.sort(key=lambda f: f[:3])
+        inserts = {} # line: [(position, marker)]
+        for kind_i, i, start, m in found:
+            kind = m.lastgroup
+            at_end = len(lines[i]) == m.end() # heading ends the line
+            if kind == 'situation' and at_end:
+                # Mark the Summary line as v1, and the next line of text as v2.
+                add(i+1, '\\p\n\\v 1 ')
+                if i+3 < n and lines[i+2] == '':
+                    add(i+3, '\\p\n\\v 2 ')
+            elif kind == 'memory_verse' and at_end:
+                # Mark the next line of text as v3.
+                add(i+1, '\\v 3 ')
+            elif kind == 'think' and start == 0 and i > 2 and lines[i-1] == '':
+                # Mark line before as v4.
+                add(i-2, '\\p\n\\v 4 ')
+            elif kind == 'read' and at_end:
+                # Insert new paragraph before verse reference line.
+                add(i+1, '\\p ')
+            if start == 0:
+                add(i, heading_markers[kind])
+            else:
+                inserts.setdefault(i, []).append((start, heading_markers[kind]))
+
+        # Add p markers to each remaining unmarked line.
+        for i, line in enumerate(lines):
+            if i > 0 and not prefixes[i] and self.p_re.match(line):
+                prefixes[i] = '\\p '
+        for i, marks in inserts.items():
+            # From the end of the line back, so positions stay valid; later
+            # marks at the same position go in front of earlier ones.
+            line = lines[i]
+            for start, marker in sorted(marks, key=lambda mark: -mark[0]):
+                line = line[:start] + marker + line[start:]
+            lines[i] = line
+        ltext = '\n'.join(p + l for p, l in zip(prefixes, lines))
+        # Remove blank lines.
+        return ltext.replace('\n\n', '\n')
+
+
+toc_pipeline = Pipeline([
+    Stage("Mark each entry line as a new paragraph and a verse.", r'(.*\.+\s*\d+)', r'\\ip \1'),
+    Stage("Mark each description line as a new paragraph.", r'(.*\.+\s*\d+\n\n)', r'\1\\ip '),
+    Stage("Remove blank lines.", r'\n\n', r'\n'),
+])
+
+
+def handle_toc_text(m, stats=None):
+    return toc_pipeline.run(m.group(0), stats)
 
 def handle_choices_text(m):
     ctext = m.group(0)
     
 
-def handle_lesson_text(m):
-    ltext = m.group(0)
-    # Mark the Section Header.
-    ltext = re.sub(r'(?<=\\c.*\n)(.*\n)\n', r'\\s1 \1', ltext)
-    # Mark list items.
-    ltext = re.sub(r'(?<=\n)(?=•)', r'\\li1 ', ltext)
-    for t in situation.values():
-        # Mark the Section Subeader.
-        ltext = re.sub(r'(?=%s)' % t, r'\\s2 ', ltext)
-        # Mark the Summary line as v1.
-        ltext = re.sub(r'(?<=%s\n)' % t, r'\\p\n\\v 1 ', ltext)
-        # Mark the next line of text as v2.
-        ltext = re.sub(r'(?<=%s\n.*\n\n)' % t, r'\\p\n\\v 2 ', ltext)
-    for t in memory_verse.values():
-        # Mark Memory Verse as s2.
-        ltext = re.sub(r'(?=%s)' % t, r'\\s2 ', ltext)
-        # Mark the next line of text as v3.
-        ltext = re.sub(r'(?<=%s\n)' % t, r'\\v 3 ', ltext)
-    for t in think.values():
-        # Mark line before as v4.
-        ltext = re.sub(r'(?<=\n)(?=.*\n\n%s)' % t, r'\\p\n\\v 4 ', ltext)
-        # Mark Think line as v5.
-        ltext = re.sub(r'(?=%s)' % t, r'\\p\n\\v 5 ', ltext)
-    for t in how.values():
-        # Mark How line as v6.
-        ltext = re.sub(r'(?=%s)' % t, r'\\p\n\\v 6 ', ltext)
-    for t in prayer.values():
-        # Mark Prayer line as v7.
-        ltext = re.sub(r'(?=%s)' % t, r'\\p\n\\v 7 ', ltext)
-    for t in read.values():
-        # Mark Read line as v8.
-        ltext = re.sub(r'(?=%s)' % t, r'\\p\n\\v 8 ', ltext)
-        # Insert new paragraph before verse reference line.
-        ltext = re.sub(r'(?<=%s\n)' % t, r'\\p ', ltext)
-    # Add p markers to each remaining unmarked line.
-    ltext = re.sub(r'(?<=\n)(?=[\pL“(])', r'\\p ', ltext)
-    # Remove blank lines.
-    ltext = re.sub(r'\n\n', r'\n', ltext)
-    return ltext
-
-infiles = sys.argv[1:]
-for infile in infiles:
-    f = Path(infile)
-    outfile = f.with_name(f"{f.stem}_sfm.sfm")
-    text = f.read_text()
-    for l in ['en', 'sg']:
-        text = re.sub(r'(?s)(?<=\n\n%s)(.*)(?=\n\n%s)' % (contents.get(l), choices.get(l)), handle_toc_text, text)
-    text = re.sub(r'(?s)(\\c \d+.*)(?=\n\n\\c|\n\nDottie & Josh McDowell)', handle_lesson_text, text)
-
-    outfile.write_text(text)
+def handle_lesson_text(m, tokenizer):
+    return tokenizer.mark(m.group(0))
+
+def get_pipeline(headings, toc_stats=None):
+    # Timings for these stages include their nested toc pipeline or tokenizer.
+    toc = partial(handle_toc_text, stats=toc_stats)
+    lesson = partial(handle_lesson_text, tokenizer=LessonTokenizer(headings))
+    stages = [
+        Stage(
+            f"Mark the table of contents ({l}).",
+            r'(?s)(?<=\n\n%s)(.*)(?=\n\n%s)' % (headings['contents'][l], headings['choices'][l]), toc
+        )
+        for l in headings['contents']
+    ]
+    stages.append(Stage(
+        "Mark each lesson.",
+        r'(?s)(\\c \d+.*)(?=\n\n\\c|\n\nDottie & Josh McDowell)', lesson
+    ))
+    return Pipeline(stages)
+
+def convert_text(text, stats=None, headings=None):
+    """Convert lesson text to SFM. If a stats dict is given, per-stage stats
+    are kept in its 'main' and 'toc' lists."""
+    if headings is None:
+        headings = load_headings()
+    if stats is None:
+        return get_pipeline(headings).run(text)
+    for k in ('main', 'toc'):
+        stats.setdefault(k, [])
+    pipeline = get_pipeline(headings, stats['toc'])
+    return pipeline.run(text, stats['main'])
+
+def show_stats(stats, headings):
+    pipelines = {'main': get_pipeline(headings), 'toc': toc_pipeline}
+    for k, pipeline in pipelines.items():
+        if stats.get(k):
+            print(f"\n[{k}]")
+            pipeline.show_stats(stats[k])
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("infiles", nargs="+", help="the lesson text file(s) to convert")
+    p.add_argument(
+        "--headings",
+        default=headings_file,
+        help=f"JSON file of heading strings by language (default: {headings_file.name})",
+    )
+    p.add_argument(
+        "-t", "--timings",
+        action="store_true",
+        help="show match counts and time spent for each substitution",
+    )
+    args = p.parse_args()
+
+    headings = load_headings(args.headings)
+    stats = {} if args.timings else None
+    for infile in args.infiles:
+        f = Path(infile)
+        outfile = f.with_name(f"{f.stem}_sfm.sfm")
+        outfile.write_text(convert_text(f.read_text(), stats, headings))
+    if stats:
+        show_stats(stats, headings)
+
+if __name__ == '__main__':
+    main()
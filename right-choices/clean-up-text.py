@@ -1,47 +1,56 @@
 #!/usr/bin/env python3
 
-import regex as re
-# import re # look-behind requires fixed-width pattern
+import argparse
 import sys
 
 from pathlib import Path
 
-infile = Path(sys.argv[1])
-outfile = infile.with_name(f"{infile.stem}_clean.txt")
-
-file_bytes = infile.read_bytes()
-
-## Byte-level cleanup.
-# Remove null page-break characters from PDF scraping
-file_bytes = re.sub(b'\x0A\x0C', b'\x0A', file_bytes)
-
-## Text-level cleanup.
-file_text = file_bytes.decode()
-# Squeeze repeated spaces.
-file_text = re.sub(r' +', r' ', file_text)
-# Squeeze 3 or more newlines to 2.
-file_text = re.sub(r'\n{3,}', r'\n\n', file_text)
-# Remove end-of-line spaces.
-file_text = re.sub(r' *(?=\n)', r'', file_text)
-# Fix double-single quotes.
-file_text = re.sub(r'‘{2}', r'“', file_text)
-file_text = re.sub(r'’{2}', r'”', file_text)
-# Remove double newlines after TOC pg. numbers.
-file_text = re.sub(r'(?<=\. *\d+)\n{2}', r'\n', file_text)
-# Remove double newlines before bullet points.
-file_text = re.sub(r'\n{2}(?=•)', r'\n', file_text)
-# Remove double newlines after bulleted lines if mid-sentence.
-file_text = re.sub(r'(?<=•.*[\pL;])\n{2}(?=[\pL])', r'\n', file_text)
-# Remove double newlines after colons.
-file_text = re.sub(r': *\n{2,}', r':\n', file_text)
-# Re-insert double newlines after "Film”:".
-file_text = re.sub(r'(?<=Film”: *)', r'\n', file_text)
-# Remove double newlines before lines beginning in "(" (Bible references).
-file_text = re.sub(r'\n+ *\(', r'\n(', file_text)
-# Remove mid-sentence double newlines.
-file_text = re.sub(r'(?<=\pL) *\n{2,} *(?=\pL)', r'\n', file_text)
-# Re-insert double newlines before "A Situation and a Choice:".
-file_text = re.sub(r'(?<=\S)\n(?=A Situation and a Choice:)', r'\n\n', file_text)
-file_text = re.sub(r'(?<=\S)\n(?=Soro oko na popo ni:)', r'\n\n', file_text)
-
-outfile.write_text(file_text)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'text'))
+from regex_pipeline import Pipeline, Stage
+
+
+pipeline = Pipeline([
+    # Byte-level cleanup; "\n\f" is the same in bytes and in decoded UTF-8 text.
+    Stage("Remove null page-break characters from PDF scraping", r'\n\f', r'\n'),
+    # Text-level cleanup.
+    Stage("Squeeze repeated spaces.", r' +', r' '),
+    Stage("Squeeze 3 or more newlines to 2.", r'\n{3,}', r'\n\n'),
+    Stage("Remove end-of-line spaces.", r' *(?=\n)', r''),
+    Stage("Fix double-single quotes (opening).", r'‘{2}', r'“'),
+    Stage("Fix double-single quotes (closing).", r'’{2}', r'”'),
+    Stage("Remove double newlines after TOC pg. numbers.", r'(?<=\. *\d+)\n{2}', r'\n'),
+    Stage("Remove double newlines before bullet points.", r'\n{2}(?=•)', r'\n'),
+    Stage("Remove double newlines after bulleted lines if mid-sentence.", r'(?<=•.*[\pL;])\n{2}(?=[\pL])', r'\n'),
+    Stage("Remove double newlines after colons.", r': *\n{2,}', r':\n'),
+    Stage("Re-insert double newlines after \"Film”:\".", r'(?<=Film”: *)', r'\n'),
+    Stage("Remove double newlines before lines beginning in \"(\" (Bible references).", r'\n+ *\(', r'\n('),
+    Stage("Remove mid-sentence double newlines.", r'(?<=\pL) *\n{2,} *(?=\pL)', r'\n'),
+    Stage("Re-insert double newlines before \"A Situation and a Choice:\".", r'(?<=\S)\n(?=A Situation and a Choice:)', r'\n\n'),
+    Stage("Re-insert double newlines before \"Soro oko na popo ni:\".", r'(?<=\S)\n(?=Soro oko na popo ni:)', r'\n\n'),
+])
+
+
+def clean_text(text, stats=None):
+    return pipeline.run(text, stats)
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("infile", help="the text file scraped from the PDF")
+    p.add_argument(
+        "-t", "--timings",
+        action="store_true",
+        help="show match counts and time spent for each substitution",
+    )
+    args = p.parse_args()
+
+    infile = Path(args.infile)
+    outfile = infile.with_name(f"{infile.stem}_clean.txt")
+
+    stats = [] if args.timings else None
+    file_text = clean_text(infile.read_bytes().decode(), stats)
+    outfile.write_text(file_text)
+    if stats:
+        pipeline.show_stats(stats)
+
+if __name__ == '__main__':
+    main()
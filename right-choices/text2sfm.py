@@ -1,11 +1,13 @@
 #!/usr/bin/env python3
 
-import regex as re
-# import re # look-behind requires fixed-width pattern
+import argparse
 import sys
 
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'text'))
+from regex_pipeline import Pipeline, Stage
+
 situation = {
     'en': "A Situation and a Choice:",
     'sg': "Soro oko na popo ni:",
@@ -22,58 +24,69 @@ read = {
     'en': "Read the Story in Your Bible:",
     'sg': "Diko mbaye ni na ya ti mbeti ti Nzapa ti mo:",
 }
+# Line-ending colons that should stay end-of-line.
+end_words = [
+    'Choice:',
+    'Soro oko na popo ni:',
+    'Verse:',
+    'na li ti mo:',
+    'Film”:',
+    'Explore:',
+    'mo gi ndani:',
+    'Prayer:',
+    'Sambela:',
+    'Bible:',
+    '\nmo:',
+    '\nti mo:',
+]
 
-infiles = sys.argv[1:]
-for infile in infiles:
-    f = Path(infile)
-    outfile = f.with_suffix('.sfm')
-    text = f.read_text()
-
-    # Remove final null page-break characters from PDF scraping.
-    text = re.sub(b'\x0A\x0C', b'\x0A', text.encode()).decode()
-    # Remove double newlines after bulleted lines if mid-sentence.
-    text = re.sub(r'(?<=•.*[\pL;,])\n{2}(?=[\pL])', r'\n', text)
-    # Remove page numbers.
-    text = re.sub(r'\n{2}\d+\n{2}\d+\n{2}', r'\n', text) # double group
-    text = re.sub(r'\n{2}\d+\n{2}', r'\n', text) # single group
-    # Re-add 2x newline before "memory verse" (English).
-    text = re.sub(r'(?<=\pP\n)(?=%s)' % memory_verse.get('en'), r'\n', text)
-    # Re-add 2x newline before "memory verse" (Sango).
-    text = re.sub(r'(?<=\pP\n)(?=%s)' % memory_verse.get('sg'), r'\n', text)
-    # Re-add 2x newline after memory verse reference.
-    text = re.sub(r'(?<=\(.*[\db]\)\n)(?!\n)', r'\n', text)
-    # Ensure 2x newline before lesson title.
-    text = re.sub(r'(?<=\S\n)(.+\n{2})(?=%s)' % situation.get('en'), r'\n\n\1', text)
-    text = re.sub(r'(?<=\S\n)(.+\n{2})(?=%s)' % situation.get('sg'), r'\n\n\1', text)
-    # Add 2x newline after line-ending colons that should stay end-of-line.
-    end_words = [
-        'Choice:',
-        'Soro oko na popo ni:',
-        'Verse:',
-        'na li ti mo:',
-        'Film”:',
-        'Explore:',
-        'mo gi ndani:',
-        'Prayer:',
-        'Sambela:',
-        'Bible:',
-        '\nmo:',
-        '\nti mo:',
-    ]
-    for w in end_words:
-        text = re.sub(r'(?<=%s)' % w, r'\n', text)
-    # Remove mid-paragraph newlines.
-    text = re.sub(r'(?<=[\w\.,,?;”’»!:\)—-])\n(?=[\w“‘«\(])', r' ', text) 
-    # Remove 2x newline after line-ending colons.
-    for w in end_words:
-        text = re.sub(r'(?<=%s\n)\n' % w, r'', text)
-    # Remove extra 2x newline after Bible Verse (Sango).
-    text = re.sub(r'(?<=mbeti ti Nzapa ti mo:\n)\n', r'', text)
-    # Put Memory Verse reference back on own line.
-    text = re.sub(r'(?<=%s\n.* )(?=\()' % memory_verse.get('en'), r'\n', text)
-    text = re.sub(r'(?<=%s\n.* )(?=\()' % memory_verse.get('sg'), r'\n', text)
-    # Squeeze 3+ newlines into 2.
-    text = re.sub(r'\n{3,}', r'\n\n', text)
+pipeline = Pipeline([
+    Stage("Remove final null page-break characters from PDF scraping.", r'\n\f', r'\n'),
+    Stage("Remove double newlines after bulleted lines if mid-sentence.", r'(?<=•.*[\pL;,])\n{2}(?=[\pL])', r'\n'),
+    Stage("Remove page numbers (double group).", r'\n{2}\d+\n{2}\d+\n{2}', r'\n'),
+    Stage("Remove page numbers (single group).", r'\n{2}\d+\n{2}', r'\n'),
+    Stage("Re-add 2x newline before \"memory verse\" (English).", r'(?<=\pP\n)(?=%s)' % memory_verse.get('en'), r'\n'),
+    Stage("Re-add 2x newline before \"memory verse\" (Sango).", r'(?<=\pP\n)(?=%s)' % memory_verse.get('sg'), r'\n'),
+    Stage("Re-add 2x newline after memory verse reference.", r'(?<=\(.*[\db]\)\n)(?!\n)', r'\n'),
+    Stage("Ensure 2x newline before lesson title (English).", r'(?<=\S\n)(.+\n{2})(?=%s)' % situation.get('en'), r'\n\n\1'),
+    Stage("Ensure 2x newline before lesson title (Sango).", r'(?<=\S\n)(.+\n{2})(?=%s)' % situation.get('sg'), r'\n\n\1'),
+    *[
+        Stage(f"Add 2x newline after {w!r}.", r'(?<=%s)' % w, r'\n')
+        for w in end_words
+    ],
+    Stage("Remove mid-paragraph newlines.", r'(?<=[\w\.,,?;”’»!:\)—-])\n(?=[\w“‘«\(])', r' '),
+    *[
+        Stage(f"Remove 2x newline after {w!r}.", r'(?<=%s\n)\n' % w, r'')
+        for w in end_words
+    ],
+    Stage("Remove extra 2x newline after Bible Verse (Sango).", r'(?<=mbeti ti Nzapa ti mo:\n)\n', r''),
+    Stage("Put Memory Verse reference back on own line (English).", r'(?<=%s\n.* )(?=\()' % memory_verse.get('en'), r'\n'),
+    Stage("Put Memory Verse reference back on own line (Sango).", r'(?<=%s\n.* )(?=\()' % memory_verse.get('sg'), r'\n'),
+    Stage("Squeeze 3+ newlines into 2.", r'\n{3,}', r'\n\n'),
     # Add \c markers manually before each lesson.
+])
+
+
+def convert_text(text, stats=None):
+    return pipeline.run(text, stats)
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("infiles", nargs="+", help="the cleaned-up text file(s) to prepare for SFM")
+    p.add_argument(
+        "-t", "--timings",
+        action="store_true",
+        help="show match counts and time spent for each substitution",
+    )
+    args = p.parse_args()
+
+    stats = [] if args.timings else None
+    for infile in args.infiles:
+        f = Path(infile)
+        outfile = f.with_suffix('.sfm')
+        outfile.write_text(convert_text(f.read_text(), stats))
+    if stats:
+        pipeline.show_stats(stats)
 
-    outfile.write_text(text)
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+"""
+Measure the throughput of the USFM tokenizer (usfm.py) on a full Bible: either
+the books of a given folder or project, or a synthetic 66-book Bible of about
+the usual size (31,000 verses).
+
+    ./benchmark.py
+    ./benchmark.py ~/Paratext8Projects/PROJ
+
+Writing the events back out should reproduce each book; any lines that differ
+(e.g. attributes written in their full form) are reported.
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+
+from pathlib import Path
+
+from usfm import parse_file, to_text
+
+words = "na ti so ayeke lo zo a Nzapa ala mbi ngangu ye kue tongaso ni".split()
+book_codes = [f"B{i:02d}" for i in range(66)]
+
+
+def verse(rng):
+    s = ' '.join(rng.choice(words) for i in range(rng.randint(15, 40)))
+    if rng.random() < 0.05:
+        s += " \\f + \\fr 1.1 \\ft " + ' '.join(rng.choices(words, k=8)) + "\\f*"
+    if rng.random() < 0.05:
+        s += " \\w " + rng.choice(words) + "|lemma=\"" + rng.choice(words) + "\"\\w*"
+    return s + '.'
+
+def make_bible(folder, seed=1):
+    rng = random.Random(seed)
+    for i, code in enumerate(book_codes):
+        with open(folder / f"{i+1:02d}{code}TST.SFM", 'w') as f:
+            f.write(f"\\id {code} Synthetic test text\n\\h Book {i+1}\n\\mt1 Book {i+1}\n")
+            # 66 books x 25 chapters x 19 verses: about 31,000 verses.
+            for c in range(1, 26):
+                f.write(f"\\c {c}\n\\s1 {verse(rng)}\n\\p\n")
+                for v in range(1, 20):
+                    f.write(f"\\v {v} {verse(rng)}\n")
+
+def run(book_files, func):
+    start = time.perf_counter()
+    count = sum(func(f) for f in book_files)
+    return count, time.perf_counter() - start
+
+def read_lines(book_file):
+    with open(book_file, encoding='utf-8-sig') as f:
+        return sum(1 for line in f)
+
+def count_events(book_file):
+    return sum(1 for e in parse_file(book_file))
+
+def round_trip(book_file):
+    text = ''.join(to_text(parse_file(book_file)))
+    with open(book_file, encoding='utf-8-sig', newline='') as f:
+        original = f.read()
+    if text != original:
+        changed = [
+            (n, a, b) for n, (a, b) in
+            enumerate(zip(original.splitlines(True), text.splitlines(True)), start=1)
+            if a != b
+        ]
+        print(f"{book_file.name}: {len(changed) or 'no'} lines written differently", file=sys.stderr)
+        for n, a, b in changed[:1]:
+            print(f"  {n}: {a.rstrip()}\n  {n}: {b.rstrip()}", file=sys.stderr)
+    return 1
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument(
+        "folder",
+        nargs="?",
+        help="a folder of SFM files (default: a synthetic Bible)",
+    )
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.folder:
+            folder = Path(args.folder)
+        else:
+            folder = Path(tmp)
+            make_bible(folder)
+        book_files = sorted(f for f in folder.iterdir() if f.suffix.lower() == '.sfm')
+        size = sum(f.stat().st_size for f in book_files) / 1e6
+        print(f"{len(book_files)} books, {size:.1f} MB")
+        print(f"{'test':<12} {'count':>9} {'seconds':>8} {'MB/s':>7}")
+        for name, func in (('read lines', read_lines), ('tokenize', count_events), ('round trip', round_trip)):
+            count, elapsed = run(book_files, func)
+            print(f"{name:<12} {count:>9} {elapsed:>8.2f} {size / elapsed:>7.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Canonical table of the 66 Bible books, built once at import:
+    from books import by_code, by_number
+    by_code['MAT'].number       # 40
+    by_code['MAT'].audio_id     # 'B40'
+    by_code['MAT'].paratext_id  # '41', as in "41MATPROJ.SFM"
+    by_number[1].name           # 'Genesis'
+"""
+
+from collections import namedtuple
+
+book_names = (
+    ('GEN', "Genesis"), ('EXO', "Exodus"), ('LEV', "Leviticus"),
+    ('NUM', "Numbers"), ('DEU', "Deuteronomy"), ('JOS', "Joshua"),
+    ('JDG', "Judges"), ('RUT', "Ruth"), ('1SA', "1 Samuel"),
+    ('2SA', "2 Samuel"), ('1KI', "1 Kings"), ('2KI', "2 Kings"),
+    ('1CH', "1 Chronicles"), ('2CH', "2 Chronicles"), ('EZR', "Ezra"),
+    ('NEH', "Nehemiah"), ('EST', "Esther"), ('JOB', "Job"),
+    ('PSA', "Psalms"), ('PRO', "Proverbs"), ('ECC', "Ecclesiastes"),
+    ('SNG', "Song of Songs"), ('ISA', "Isaiah"), ('JER', "Jeremiah"),
+    ('LAM', "Lamentations"), ('EZK', "Ezekiel"), ('DAN', "Daniel"),
+    ('HOS', "Hosea"), ('JOL', "Joel"), ('AMO', "Amos"),
+    ('OBA', "Obadiah"), ('JON', "Jonah"), ('MIC', "Micah"),
+    ('NAM', "Nahum"), ('HAB', "Habakkuk"), ('ZEP', "Zephaniah"),
+    ('HAG', "Haggai"), ('ZEC', "Zechariah"), ('MAL', "Malachi"),
+    ('MAT', "Matthew"), ('MRK', "Mark"), ('LUK', "Luke"),
+    ('JHN', "John"), ('ACT', "Acts"), ('ROM', "Romans"),
+    ('1CO', "1 Corinthians"), ('2CO', "2 Corinthians"), ('GAL', "Galatians"),
+    ('EPH', "Ephesians"), ('PHP', "Philippians"), ('COL', "Colossians"),
+    ('1TH', "1 Thessalonians"), ('2TH', "2 Thessalonians"), ('1TI', "1 Timothy"),
+    ('2TI', "2 Timothy"), ('TIT', "Titus"), ('PHM', "Philemon"),
+    ('HEB', "Hebrews"), ('JAS', "James"), ('1PE', "1 Peter"),
+    ('2PE', "2 Peter"), ('1JN', "1 John"), ('2JN', "2 John"),
+    ('3JN', "3 John"), ('JUD', "Jude"), ('REV', "Revelation"),
+)
+
+
+class Book(namedtuple('Book', ('code', 'number', 'name'))):
+    __slots__ = ()
+
+    @property
+    def testament(self):
+        return 'old' if self.number <= 39 else 'new'
+
+    @property
+    def audio_id(self):
+        # Audio Bibles number the books B01-B66.
+        return f"B{self.number:02d}"
+
+    @property
+    def paratext_id(self):
+        # Paratext skips 40, so that Matthew is 41.
+        return f"{self.number if self.number <= 39 else self.number + 1:02d}"
+
+
+books = tuple(Book(code, n, name) for n, (code, name) in enumerate(book_names, start=1))
+ot_books = books[:39]
+nt_books = books[39:]
+by_code = {b.code: b for b in books}
+by_number = {b.number: b for b in books}
+by_audio_id = {b.audio_id: b for b in books}
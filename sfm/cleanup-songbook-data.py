@@ -7,27 +7,28 @@
     It inserts the correct verse number in between the two spaces described above.
 2. Ensure choruses are repeated after each verse.
 3. Set chorus SFM as /q2.
+
+Several files, folders or glob patterns can be given; they're processed in
+parallel. Files are skipped if neither their content nor the chosen options
+have changed since the last run, as recorded in a .cleanup-songbook-data.json
+manifest in each file's folder.
 """
 # TODO: Consider adding:
 # - Insert song number on own line after song title.
 
 import argparse
-import re
-import sys
-import unicodedata
+import glob
+import hashlib
+import json
+import os
 
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+from normalize import normalize_lines
+
+manifest_name = '.cleanup-songbook-data.json'
 
-def strip_non_printables(input_lines):
-    output_lines = []
-    all_chars = (chr(i) for i in range(sys.maxunicode))
-    control_chars = ''.join(c for c in all_chars if unicodedata.category(c) == 'Cc')
-    control_char_re = re.compile(f"[{re.escape(control_chars)}]")
-    for input_line in input_lines:
-        line = control_char_re.sub('', input_line)
-        output_lines.append(line + '\n') # add newlines back in
-    return output_lines
 
 def get_first_letter_indexes(s):
     indexes = [0]
@@ -65,157 +66,182 @@ def get_sfm_data_int(line):
             pass
     return data_int
 
-def get_songs(lines):
-    songs = {}
-    song_number = None
-    for line in lines:
+def iter_songs(lines):
+    """Yield the lines of each song, starting with its \\c line, as (i, sfm,
+    line) tuples. The first group yielded holds the lines before the first song.
+    """
+    song = []
+    for i, line in enumerate(lines):
         sfm = get_sfm(line)
-        if sfm == '\id': # 1st line of file
-            song_number = 0
-            songs[song_number] = []
-        elif sfm == '\c': # start of song
-            song_number = get_sfm_data_int(line)
-            songs[song_number] = []
-        if song_number is None:
-            continue
-        songs[song_number].append(line)
-    return songs
+        if sfm == '\\c':
+            yield song
+            song = []
+        song.append((i, sfm, line))
+    yield song
 
-def get_text_blocks(song_number, lines):
+def get_text_blocks(song):
     # Text blocks are a series of lines beginning with \q1,
     #   followed by other \q1 markers or \v markers.
     blocks = []
-    block_number = None
-    for i, line in enumerate(lines):
-        sfm = get_sfm(line)
-        prev_sfm = None
-        next_sfm = None
-        if i > 0:
-            prev_sfm = get_sfm(lines[i-1])
-        if i < len(lines)-1:
-            next_sfm = get_sfm(lines[i+1])
-        if sfm == '\c' and not block_number: # start of the title block
-            block_number = 0
+    prev_sfm = None
+    for i, sfm, line in song:
+        if sfm == '\c' and not blocks: # start of the title block
             blocks.append({
                 'type': 'title',
                 'lines': [],
             })
         elif sfm == '\q1' and len(line.split()) == 1: # start of verse block
-            block_number += 1
-
             blocks.append({
                 'type': 'verse',
                 'lines': [],
             })
         elif ( sfm == '\q1' and prev_sfm != '\q1' and prev_sfm != '\\v' ) or ( sfm == '\q2' and prev_sfm != '\q2' ): # start of chorus block
-            block_number += 1
             blocks.append({
                 'type': 'chorus',
                 'lines': []
             })
-        blocks[block_number]['lines'].append(line)
-
-    # Ensure correct chorus SFMs.
-    output_blocks = []
-    for block in blocks:
-        if block.get('type') == 'chorus':
-            # print(f"updating block {block}")
-            block['lines'] = ensure_chorus_sfm(block.get('lines'))
-        output_blocks.append(block)
-
-    # print(output_blocks)
-    return output_blocks
-
-def ensure_chorus_sfm(chorus_lines):
-    output_chorus_lines = chorus_lines.copy()
-    for i, line in enumerate(chorus_lines):
-        if get_sfm(line) != '\q1':
-            continue
-        output_chorus_lines[i] = set_sfm(line, '\q2')
-    return output_chorus_lines
+        blocks[-1]['lines'].append((i, sfm, line))
+        prev_sfm = sfm
+    return blocks
 
-def ensure_verse_numbers(input_lines):
-    v = 1 # initialize verse number
-    output_lines = input_lines.copy()
-    for i, line in enumerate(input_lines):
-        sfm = get_sfm(line)
-        # print(f"{i}: {line.rstrip()}")
-        if sfm == '\c': # start of new "chapter"/song
-            # print(f"Start of next song")
-            v = 1
-        elif sfm == '\\v':
-            # print(f"Start of next verse")
-            # if line[:4] == '\\v  ':
-            verse_number = get_sfm_data_int(line)
-            if not verse_number:
-                print(f"{i}: Inserting verse number \"{v}\"")
-                # line = f"\\v {v} {line[4:]}"
-                terms = line.split()
-                terms.insert(1, str(v))
-                line = ' '.join(terms)
-                v += 1
-            # elif line[3] == str(v): # verse already correctly numbered
-            elif verse_number == v: # verse already correctly numbered
-                # print(f"Verse number already correct.")
-                v += 1
-            else: # wrong verse number
-                print(f"{i}: Correcting verse number \"{verse_number}\" to \"{v}\"")
-            # elif line[3] != ' ': # verse malformed
-            #     print(f"ERROR: Bad line format.")
-        output_lines[i] = line
-    return output_lines
-
-def ensure_repeated_choruses(songs):
-    output_lines = [songs[0][0]]
-    for n, lines in songs.items():
-        if n == 0:
+
+def ensure_verse_number(i, line, v, counts, verbose=True):
+    """Return the line with its verse number ensured and the next expected
+    verse number."""
+    verse_number = get_sfm_data_int(line)
+    if not verse_number:
+        if verbose:
+            print(f"{i}: Inserting verse number \"{v}\"")
+        counts['verses_numbered'] += 1
+        terms = line.split()
+        terms.insert(1, str(v))
+        line = ' '.join(terms) + '\n'
+        v += 1
+    elif verse_number == v: # verse already correctly numbered
+        v += 1
+    else: # wrong verse number
+        if verbose:
+            print(f"{i}: Correcting verse number \"{verse_number}\" to \"{v}\"")
+        counts['verses_wrong'] += 1
+    return line, v
+
+def ensure_title_case(line):
+    j_firsts = set(get_first_letter_indexes(line))
+    return ''.join(c if j in j_firsts else c.lower() for j, c in enumerate(line))
+
+def fix_songbook(lines, verse_numbers=False, choruses=False, titles=False, counts=None, verbose=True):
+    """Yield the output lines, applying all requested fixes to each song in a
+    single traversal; only one song is held in memory at a time. The number of
+    fixes of each kind is added to the counts dict, if given."""
+    if counts is None:
+        counts = {}
+    for k in ('verses_numbered', 'verses_wrong', 'choruses_added'):
+        counts.setdefault(k, 0)
+    for n, song in enumerate(iter_songs(lines)):
+        if n == 0 or not choruses: # lines before the 1st song, or no blocks needed
+            blocks = [{'type': None, 'lines': song}]
+        else:
+            blocks = get_text_blocks(song)
+
+        # Fix each line, in order.
+        v = 1 # initialize verse number
+        chorus_lines = None
+        for block in blocks:
+            fixed_lines = []
+            for i, sfm, line in block.get('lines'):
+                if verse_numbers and sfm == '\\v':
+                    line, v = ensure_verse_number(i, line, v, counts, verbose)
+                elif titles and sfm == '\s': # all titles are assumed to be \s lines
+                    line = ensure_title_case(line)
+                elif block.get('type') == 'chorus' and sfm == '\q1':
+                    # Ensure correct chorus SFMs.
+                    line = set_sfm(line, '\q2')
+                fixed_lines.append(line)
+            block['lines'] = fixed_lines
+            if block.get('type') == 'chorus':
+                chorus_lines = fixed_lines
+
+        # Put the (last) chorus after every verse that isn't followed by one.
+        for k, block in enumerate(blocks):
+            yield from block.get('lines')
+            next_block_type = blocks[k+1].get('type') if k+1 < len(blocks) else None
+            if chorus_lines and block.get('type') == 'verse' and next_block_type != 'chorus':
+                counts['choruses_added'] += 1
+                yield from chorus_lines
+
+def get_infiles(paths):
+    """Return the files named by paths, each once, even if it's named both
+    directly and through a folder or glob."""
+    infiles = []
+    seen = set()
+    for path in paths:
+        if Path(path).is_dir():
+            matches = sorted(Path(path).glob('*.sfm'))
+        elif glob.has_magic(path):
+            matches = sorted(Path(m) for m in glob.glob(path))
+        else:
+            matches = [Path(path)]
+        for m in matches:
+            if m.name.endswith('.mod.sfm') or m.resolve() in seen:
+                continue
+            seen.add(m.resolve())
+            infiles.append(m)
+    return infiles
+
+def get_hash(infile):
+    return hashlib.sha256(infile.read_bytes()).hexdigest()
+
+def load_manifest(folder):
+    manifest_file = folder / manifest_name
+    if manifest_file.is_file():
+        return json.loads(manifest_file.read_text())
+    return {}
+
+def save_manifest(folder, manifest):
+    (folder / manifest_name).write_text(json.dumps(manifest, indent=2))
+
+def process_file(infile, options, verbose=True):
+    """Write infile's cleaned-up .mod.sfm file and return the fix counts."""
+    outfile = infile.with_suffix('.mod.sfm')
+    counts = {}
+    with infile.open() as f, outfile.open('w') as out:
+        # Always strip non-printable characters.
+        lines = normalize_lines(f, options.get('unicode_form'))
+        out.writelines(fix_songbook(
+            lines,
+            verse_numbers=options.get('verse_numbers'),
+            choruses=options.get('choruses'),
+            titles=options.get('titles'),
+            counts=counts,
+            verbose=verbose,
+        ))
+    return counts
+
+def show_summary(results):
+    width = max(len(str(f)) for f in results)
+    print(f"\n{'file':<{width}}  {'verses numbered':>15}  {'wrong numbers':>13}  {'choruses added':>14}")
+    for infile, counts in results.items():
+        if counts is None:
+            print(f"{str(infile):<{width}}  {'(unchanged)':>15}")
             continue
-        text_blocks = get_text_blocks(n, lines)
-        text_blocks_out = text_blocks.copy()
-        chorus_data = None
-        for block_data in text_blocks:
-            if block_data.get('type') == 'chorus':
-                chorus_data = block_data
-        if chorus_data:
-            for i, block_data in enumerate(text_blocks):
-                try:
-                    next_block_data = text_blocks[i+1]
-                except IndexError:
-                    next_block_data = None
-                next_block_type = next_block_data.get('type') if next_block_data else None
-                if block_data.get('type') == 'verse' and next_block_type != 'chorus': # insert chorus
-                    # Determine insertion index by position from end of original list.
-                    insertion_index = i-len(text_blocks)+1
-                    if insertion_index == 0: # use end position of new list
-                        insertion_index = len(text_blocks_out)
-                    # print(f"Song: {n}; inserting chorus to index {insertion_index}")
-                    text_blocks_out.insert(insertion_index, chorus_data)
-        for text_block in text_blocks_out:
-            output_lines.extend(text_block.get('lines'))
-    return output_lines
-
-def ensure_title_case(input_lines):
-    output_lines = input_lines.copy()
-    for i, line in enumerate(input_lines):
-        if get_sfm(line) == '\s': # all titles are assumed to be \s lines
-            # text = line.split()[1:]
-            # updated_text = ['\s']
-            updated_line = ''
-            j_firsts = get_first_letter_indexes(line)
-            for j, c in enumerate(line):
-                if j not in j_firsts:
-                    c = c.lower()
-                updated_line += c
-            output_lines[i] = updated_line
-    return output_lines
+        print(
+            f"{str(infile):<{width}}  {counts['verses_numbered']:>15}  "
+            f"{counts['verses_wrong']:>13}  {counts['choruses_added']:>14}"
+        )
+
+def positive_int(string):
+    n = int(string)
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1: {n}")
+    return n
 
 def main():
     p = argparse.ArgumentParser()
     p.add_argument(
         "infile",
         metavar="infile",
-        nargs=1,
-        help="the file to be cleaned up",
+        nargs="+",
+        help="the file(s), folder(s) or glob pattern(s) to be cleaned up",
     )
     p.add_argument(
         "-c", "--choruses",
@@ -232,6 +258,22 @@ def main():
         action="store_true",
         help="ensure song titles use Title Case",
     )
+    p.add_argument(
+        "-u", "--unicode-form",
+        choices=["NFC", "NFD"],
+        help="also normalize the text to this Unicode form",
+    )
+    p.add_argument(
+        "-j", "--jobs",
+        type=positive_int,
+        default=os.cpu_count(),
+        help="number of files to process at the same time",
+    )
+    p.add_argument(
+        "-f", "--force",
+        action="store_true",
+        help="process files even if they haven't changed since the last run",
+    )
     args = p.parse_args()
 
     # Handle commandline arguments
@@ -240,25 +282,51 @@ def main():
         p.print_help()
         exit(1)
 
-    infile = Path(args.infile[0]) # only 1 infile allowed
-    outfile = infile.with_suffix('.mod.sfm')
-    with infile.open() as f:
-        original_lines = f.readlines()
-
-    # Always strip non-printable characters.
-    lines = strip_non_printables(original_lines)
+    options = {
+        'verse_numbers': args.verse_numbers,
+        'choruses': args.choruses,
+        'titles': args.titles,
+        'unicode_form': args.unicode_form,
+    }
+    infiles = get_infiles(args.infile)
+    if not infiles:
+        print(f"error: No songbook files found.")
+        exit(1)
 
-    if args.verse_numbers:
-        lines = ensure_verse_numbers(lines)
+    # Skip files whose content and options match the last run.
+    manifests = {}
+    hashes = {}
+    todo = []
+    results = {}
+    for infile in infiles:
+        folder = infile.resolve().parent
+        manifest = manifests.setdefault(folder, load_manifest(folder))
+        hashes[infile] = get_hash(infile)
+        entry = {'hash': hashes[infile], 'options': options}
+        if not args.force and manifest.get(infile.name) == entry and infile.with_suffix('.mod.sfm').is_file():
+            results[infile] = None
+        else:
+            todo.append(infile)
+            results[infile] = {}
 
-    if args.choruses:
-        lines = ensure_repeated_choruses(get_songs(lines))
+    verbose = len(infiles) == 1 # per-line messages would be interleaved
+    if len(todo) > 1 and args.jobs > 1:
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            counts = executor.map(process_file, todo, [options] * len(todo), [verbose] * len(todo))
+            for infile, file_counts in zip(todo, counts):
+                results[infile] = file_counts
+    else:
+        for infile in todo:
+            results[infile] = process_file(infile, options, verbose)
 
-    if args.titles:
-        lines = ensure_title_case(lines)
+    for infile in todo:
+        folder = infile.resolve().parent
+        manifests[folder][infile.name] = {'hash': hashes[infile], 'options': options}
+    for folder, manifest in manifests.items():
+        save_manifest(folder, manifest)
 
-    # Write out new file.
-    outfile.write_text(''.join(lines))
+    if len(infiles) > 1:
+        show_summary(results)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,257 @@
+#!/usr/bin/python3
+
+"""
+Build word frequency and bigram tables and a KWIC (keyword in context)
+concordance for all the books of a Paratext project.
+
+    concordance.py PROJ                  # 50 most frequent words
+    concordance.py PROJ -b -n 20         # 20 most frequent bigrams
+    concordance.py PROJ -k ndeke         # every occurrence of "ndeke" in context
+
+Each book is tokenized once, in a process pool, and stored in
+~/Paratext8Projects/_concordance/PROJ as a small binary file: the book's
+vocabulary, its text as an array of word numbers and the position where each
+verse starts. Books are retokenized only when their size or modification time
+changes; all the tables are computed from the stored arrays.
+"""
+
+import argparse
+import json
+import os
+import struct
+import time
+import unicodedata
+
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from spelling import get_words, skip_markers
+from usfm import parse_file
+
+pt_home = Path.home() / "Paratext8Projects"
+cache_home = pt_home / "_concordance"
+
+# File layout: magic, header length, JSON header, token ids, verse starts.
+magic = b'LTCC1'
+header_struct = struct.Struct('<I')
+
+
+class BookData:
+    """A tokenized book: words[i] is vocab[tokens[i]], and the verse refs[j]
+    begins at tokens[starts[j]]."""
+    __slots__ = ('name', 'mtime', 'size', 'vocab', 'refs', 'tokens', 'starts')
+
+    def __init__(self, name, mtime, size, vocab, refs, tokens, starts):
+        self.name = name
+        self.mtime = mtime
+        self.size = size
+        self.vocab = vocab
+        self.refs = refs
+        self.tokens = tokens
+        self.starts = starts
+
+    @property
+    def book(self):
+        return self.name[2:5] # e.g. "41MATPROJ.SFM"
+
+    def get_ref(self, position):
+        """Return the "C:V" reference of the token at the given position."""
+        # The last verse starting at or before the position.
+        i = bisect_right(self.starts, position)
+        return self.refs[i-1] if i else '0:0'
+
+    def save(self, path):
+        header = json.dumps({
+            'name': self.name,
+            'mtime': self.mtime,
+            'size': self.size,
+            'vocab': self.vocab,
+            'refs': self.refs,
+            'tokens': len(self.tokens),
+        }, ensure_ascii=False).encode('utf-8')
+        tmp = path.with_suffix('.tmp')
+        with tmp.open('wb') as f:
+            f.write(magic)
+            f.write(header_struct.pack(len(header)))
+            f.write(header)
+            self.tokens.tofile(f)
+            self.starts.tofile(f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, header_only=False):
+        with path.open('rb') as f:
+            if f.read(len(magic)) != magic:
+                raise ValueError(f"Not a concordance file: {path}")
+            (length,) = header_struct.unpack(f.read(header_struct.size))
+            header = json.loads(f.read(length))
+            tokens = array('I')
+            starts = array('I')
+            if not header_only:
+                tokens.fromfile(f, header['tokens'])
+                starts.fromfile(f, len(header['refs']))
+        return cls(
+            header['name'], header['mtime'], header['size'],
+            header['vocab'], header['refs'], tokens, starts,
+        )
+
+
+def tokenize_book(book_file, cache_file):
+    """Tokenize the book and save it to the cache file."""
+    ids = {}
+    tokens = array('I')
+    refs = []
+    starts = array('I')
+    for event in parse_file(book_file):
+        if event.marker == 'v' and event.number:
+            refs.append(f"{event.chapter}:{event.verse}")
+            starts.append(len(tokens))
+        if event.marker in skip_markers:
+            continue
+        for word in get_words(event.text):
+            tokens.append(ids.setdefault(word.lower(), len(ids)))
+    stat = book_file.stat()
+    BookData(book_file.name, stat.st_mtime, stat.st_size, list(ids), refs, tokens, starts).save(cache_file)
+    return book_file.name
+
+def update_cache(book_files, cache_dir, jobs=None, rebuild=False):
+    """Retokenize new or changed books and remove the data of deleted ones.
+
+    Returns the number of books that were (re)tokenized.
+    """
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    todo = []
+    for book_file in book_files:
+        cache_file = cache_dir / f"{book_file.name}.bin"
+        stat = book_file.stat()
+        if not rebuild and cache_file.is_file():
+            cached = BookData.load(cache_file, header_only=True)
+            if (cached.mtime, cached.size) == (stat.st_mtime, stat.st_size):
+                continue
+        todo.append((book_file, cache_file))
+    if len(todo) > 1 and jobs != 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            list(executor.map(tokenize_book, *zip(*todo)))
+    else:
+        for book_file, cache_file in todo:
+            tokenize_book(book_file, cache_file)
+
+    current = {f"{book_file.name}.bin" for book_file in book_files}
+    for cache_file in cache_dir.glob('*.bin'):
+        if cache_file.name not in current:
+            cache_file.unlink()
+    return len(todo)
+
+def get_frequencies(books):
+    totals = Counter()
+    for data in books:
+        counts = Counter(data.tokens)
+        totals.update({data.vocab[i]: n for i, n in counts.items()})
+    return totals
+
+def get_bigrams(books):
+    totals = Counter()
+    for data in books:
+        counts = Counter(zip(data.tokens, data.tokens[1:]))
+        vocab = data.vocab
+        totals.update({(vocab[a], vocab[b]): n for (a, b), n in counts.items()})
+    return totals
+
+def get_concordance(books, word, width=5):
+    """Yield (book, ref, left context, right context) for each occurrence."""
+    word = unicodedata.normalize('NFC', word).lower()
+    for data in books:
+        try:
+            word_id = data.vocab.index(word)
+        except ValueError:
+            continue
+        tokens = data.tokens
+        for pos, token in enumerate(tokens):
+            if token != word_id:
+                continue
+            left = ' '.join(data.vocab[i] for i in tokens[max(pos - width, 0):pos])
+            right = ' '.join(data.vocab[i] for i in tokens[pos + 1:pos + 1 + width])
+            yield data.book, data.get_ref(pos), left, right
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument(
+        "project",
+        help="the Paratext project name, or a folder of SFM files",
+    )
+    p.add_argument(
+        "-b", "--bigrams",
+        action="store_true",
+        help="list the most frequent bigrams instead of words",
+    )
+    p.add_argument(
+        "-k", "--kwic",
+        metavar="WORD",
+        help="list every occurrence of the word with its context",
+    )
+    p.add_argument(
+        "-w", "--width",
+        type=int,
+        default=5,
+        help="number of context words on each side (default: 5)",
+    )
+    p.add_argument(
+        "-n", "--number",
+        type=int,
+        default=50,
+        help="list at most this many words or bigrams (0: all)",
+    )
+    p.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="number of books to tokenize at the same time",
+    )
+    p.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="retokenize all books",
+    )
+    args = p.parse_args()
+
+    proj_dir = Path(args.project)
+    if not proj_dir.is_dir():
+        proj_dir = pt_home / args.project
+    if not proj_dir.is_dir():
+        print(f"Error: No project \"{args.project}\".")
+        exit(1)
+    book_files = sorted(f for f in proj_dir.iterdir() if f.suffix.lower() == '.sfm')
+    if not book_files:
+        print(f"Error: No SFM files in {proj_dir}")
+        exit(1)
+    cache_dir = cache_home / proj_dir.resolve().name
+
+    start = time.perf_counter()
+    updated_ct = update_cache(book_files, cache_dir, jobs=args.jobs, rebuild=args.rebuild)
+    if updated_ct:
+        elapsed = time.perf_counter() - start
+        size = sum(f.stat().st_size for f in cache_dir.glob('*.bin'))
+        print(f"Tokenized {updated_ct} book(s) in {elapsed:.2f} s; data size: {size / 1024:.0f} KiB")
+    books = [BookData.load(cache_dir / f"{f.name}.bin") for f in book_files]
+    limit = args.number or None
+
+    if args.kwic:
+        lines = list(get_concordance(books, args.kwic, args.width))
+        width = max((len(left) for b, r, left, right in lines), default=0)
+        for book, ref, left, right in lines[:limit]:
+            print(f"{book} {ref:<7} {left:>{width}}  [{args.kwic}]  {right}")
+        print(f"\n{len(lines)} occurrences of \"{args.kwic}\"")
+    elif args.bigrams:
+        for (a, b), n in get_bigrams(books).most_common(limit):
+            print(f"{n}\t{a} {b}")
+    else:
+        frequencies = get_frequencies(books)
+        for word, n in frequencies.most_common(limit):
+            print(f"{n}\t{word}")
+        print(f"\n{sum(frequencies.values())} words, {len(frequencies)} distinct")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+"""
+Text normalization shared by the SFM scripts:
+    from normalize import normalize_lines
+    with infile.open() as f:
+        for line in normalize_lines(f, form='NFC'):
+            ...
+"""
+
+import unicodedata
+
+# Unicode's stability policy fixes the set of Cc (control) characters to
+#   U+0000-U+001F and U+007F-U+009F, so there's no need to check every code
+#   point to find them.
+control_chars = ''.join(c for c in map(chr, range(0x100)) if unicodedata.category(c) == 'Cc')
+# str.translate table that deletes control characters; built once at import.
+control_char_table = str.maketrans('', '', control_chars)
+
+
+def normalize_line(line, form=None):
+    """Remove control characters (including the line ending) from the line and
+    optionally apply a Unicode normalization form (NFC, NFD, NFKC, NFKD)."""
+    line = line.translate(control_char_table)
+    if form:
+        line = unicodedata.normalize(form, line)
+    return line
+
+def normalize_lines(lines, form=None):
+    for line in lines:
+        yield normalize_line(line, form) + '\n' # add newlines back in
@@ -2,46 +2,104 @@
 
 """
 Search a given Paratext project for details about a specific word.
+
+Words are looked up in an on-disk index kept per project in
+~/Paratext8Projects/_word-index. Books are reindexed only when their size or
+modification time changes. Matching lines are shown with their "BOOK C:V"
+reference, from the verse index kept in ~/Paratext8Projects/_verse-index.
 """
 
-import re
-import sys
+import argparse
+import os
+import regex as re
+import sqlite3
+import time
 
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
+from usfm import parse_file
+from verse_index import get_verse_index
+
 pt_home = Path.home() / "Paratext8Projects"
+index_dir = pt_home / "_word-index"
+
+# Combining marks are part of words, though \w doesn't match them.
+word_re = re.compile(r"[\w\p{M}]+")
+
+# Bump this when what's indexed changes; older indexes are then rebuilt.
+INDEX_VERSION = 2
+
+index_schema = """
+CREATE TABLE IF NOT EXISTS books (
+    file TEXT PRIMARY KEY,
+    mtime REAL,
+    size INTEGER
+);
+CREATE TABLE IF NOT EXISTS postings (
+    word TEXT,
+    file TEXT,
+    chapter TEXT,
+    verse TEXT,
+    line INTEGER
+);
+CREATE INDEX IF NOT EXISTS postings_word ON postings (word);
+CREATE INDEX IF NOT EXISTS postings_file ON postings (file);
+CREATE TABLE IF NOT EXISTS words (
+    word TEXT PRIMARY KEY
+);
+"""
 
 
+def find_matching_lines(pat, text):
+    """Return (line number, line) for each match of the multiline pattern."""
+    newline = '\n' if isinstance(text, str) else b'\n'
+    matches = []
+    n = 1
+    last = 0
+    for m in re.finditer(pat, text, re.MULTILINE):
+        n += text.count(newline, last, m.start())
+        last = m.start()
+        matches.append((n, m.group()))
+    return matches
+
 def count_string_occurrences_in_book(book_file, word):
     pat = f"^.*{word}.*$"
-    matches = re.findall(pat, book_file.read_text(), re.MULTILINE)
+    matches = find_matching_lines(pat, book_file.read_text())
     count = len(matches)
     return count, matches
 
 def count_byte_occurrences_in_book(book_file, word):
     pat = str.encode(f"^.*{word}.*$")
-    matches = re.findall(pat, book_file.read_bytes(), re.MULTILINE)
+    matches = find_matching_lines(pat, book_file.read_bytes())
     count = len(matches)
     return count, matches
 
+def search_book(book_file, word):
+    if word[:2] == "\\x":
+        count, matches = count_byte_occurrences_in_book(book_file, word)
+    else:
+        count, matches = count_string_occurrences_in_book(book_file, word)
+    return book_file, count, matches
+
+def get_projects(pt_home):
+    projects = [d.name for d in pt_home.iterdir() if d.is_dir() and d.stem[0] != '_']
+    projects.sort()
+    return projects
+
 def list_projects(pt_home):
     # List projects in PT directory as a guide.
-    for dir in pt_home.iterdir():
-        if dir.is_dir() and dir.stem[0] != '_':
-            print(dir.name)
-
-
-# Ensure proper number of arguments passed.
-if len(sys.argv) != 3:
-    print(f"Usage: {sys.argv[0]} <project name> <search term>")
-    print(f"\nAvailable projects:")
-    list_projects(pt_home)
-    exit(1)
-else:
-    project = sys.argv[1]
-    proj_dir = pt_home / project
-    word = sys.argv[2]
+    for project in get_projects(pt_home):
+        print(project)
 
+def get_book_files(proj_dir):
+    # List and sort the project book files.
+    files = proj_dir.iterdir()
+    book_files = [file for file in files if file.suffix == '.SFM']
+    book_files.sort()
+    return book_files
+
+def get_word_forms(word):
     # Input strings can be one of: unicode, unicode_escape, bytecode.
     if word[:2] == '\\x':
         # Bytecode-escape word passed.
@@ -59,42 +117,281 @@ else:
         word_string = word
         word_bytes = word.encode('utf-8')
         word_unicode = word.encode('unicode-escape').decode('utf-8')
+    return word_string, word_bytes, word_unicode
 
-# Ensure project exists.
-if not proj_dir.exists():
-    print(f"Error: No project \"{project}\".\n\nPlease choose one from this list:")
-    list_projects(pt_home)
-    exit(1)
-
-# List and sort the project book files.
-files = proj_dir.iterdir()
-book_files = [file for file in files if file.suffix == '.SFM']
-book_files.sort()
-
-# Check for search term in book files.
-word_ct = 0
-occurrences_dict = {}
-for book_file in book_files:
-    if word[:2] == "\\x":
-        count, matches = count_byte_occurrences_in_book(book_file, word)
+def get_book_postings(book_file):
+    """Return (word, chapter, verse, line) for each word found on each line,
+    including those of markers (e.g. "nd" of "\\nd") and attributes, so that
+    the index finds what a full-text scan of the line would."""
+    postings = []
+    line = 0
+    for event in parse_file(book_file):
+        if event.line != line:
+            line = event.line
+            seen = set()
+        parts = [event.raw or '', event.text, *(f"{k} {v}" for k, v in event.attributes.items())]
+        for word in word_re.findall(' '.join(parts)):
+            if word not in seen:
+                seen.add(word)
+                postings.append((word, event.chapter, event.verse, line))
+    return postings
+
+def open_index(project):
+    index_dir.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(index_dir / f"{project}.sqlite")
+    if con.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+        con.executescript("""
+            DROP TABLE IF EXISTS books;
+            DROP TABLE IF EXISTS postings;
+            DROP TABLE IF EXISTS words;
+        """)
+        con.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+    con.executescript(index_schema)
+    return con
+
+def update_index(con, book_files, rebuild=False):
+    """Reindex new or changed books and forget removed ones.
+
+    Returns the number of books that were (re)indexed.
+    """
+    indexed = {
+        file: (mtime, size)
+        for file, mtime, size in con.execute("SELECT file, mtime, size FROM books")
+    }
+    updated_ct = 0
+    with con:
+        for book_file in book_files:
+            stat = book_file.stat()
+            name = book_file.name
+            if not rebuild and indexed.get(name) == (stat.st_mtime, stat.st_size):
+                continue
+            postings = get_book_postings(book_file)
+            con.execute("DELETE FROM postings WHERE file = ?", (name,))
+            con.executemany(
+                "INSERT INTO postings VALUES (?, ?, ?, ?, ?)",
+                ((w, name, c, v, n) for w, c, v, n in postings)
+            )
+            con.execute(
+                "INSERT OR REPLACE INTO books VALUES (?, ?, ?)",
+                (name, stat.st_mtime, stat.st_size)
+            )
+            updated_ct += 1
+
+        current = {book_file.name for book_file in book_files}
+        removed = [name for name in indexed if name not in current]
+        for name in removed:
+            con.execute("DELETE FROM postings WHERE file = ?", (name,))
+            con.execute("DELETE FROM books WHERE file = ?", (name,))
+
+        if updated_ct or removed:
+            con.execute("DELETE FROM words")
+            con.execute("INSERT INTO words SELECT DISTINCT word FROM postings")
+    return updated_ct
+
+def search_index(con, word):
+    """Return {book file name: sorted line numbers} for lines containing the word.
+
+    The term is matched against the indexed vocabulary rather than the text,
+    so it can't match across word boundaries.
+    """
+    pat = re.compile(word)
+    vocab = [w for (w,) in con.execute("SELECT word FROM words") if pat.search(w)]
+    results = {}
+    # Stay below SQLite's limit on query parameters.
+    for i in range(0, len(vocab), 500):
+        chunk = vocab[i:i+500]
+        rows = con.execute(
+            f"SELECT file, line FROM postings WHERE word IN ({','.join('?' * len(chunk))})",
+            chunk
+        )
+        for file, line in rows:
+            results.setdefault(file, set()).add(line)
+    return {file: sorted(lines) for file, lines in sorted(results.items())}
+
+def get_lines_from_book(book_file, line_numbers):
+    wanted = set(line_numbers)
+    lines = []
+    with book_file.open() as f:
+        for n, line in enumerate(f, start=1):
+            if n in wanted:
+                lines.append((n, line.rstrip('\n')))
+    return lines
+
+def format_match(verse_index, n, line):
+    # e.g. "MAT 5:3: \v 3 ..."
+    return f"{verse_index.book} {verse_index.get_ref(line=n)}: {line}"
+
+def project_list(string):
+    projects = string.split(',')
+    if not all(projects):
+        raise argparse.ArgumentTypeError(f"empty project name: {string!r}")
+    return projects
+
+def positive_int(string):
+    n = int(string)
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1: {n}")
+    return n
+
+def is_indexable(word):
+    # The index only holds the words of the text, so markers ("\\v", "\\nd")
+    # and terms with anything else (hyphens, apostrophes, anchors, byte
+    # escapes, several words) need a full-text scan to match what it would.
+    if word.startswith('\\'):
+        return False
+    return word_re.fullmatch(word) is not None
+
+def search_projects(projects, word, jobs=None, show_lines=False):
+    """Search all books of several projects at once, printing each book's
+    results as soon as it has been searched."""
+    project_cts = {project: 0 for project in projects}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(search_book, book_file, word)
+            for project in projects
+            for book_file in get_book_files(pt_home / project)
+        ]
+        for future in as_completed(futures):
+            book_file, count, matches = future.result()
+            if not count:
+                continue
+            project = book_file.parent.name
+            project_cts[project] += count
+            print(f"{project}/{book_file.name}: {count}")
+            if show_lines:
+                verse_index = get_verse_index(book_file)
+                for n, line in matches:
+                    print(f"  {format_match(verse_index, n, line)}")
+    elapsed = time.perf_counter() - start
+
+    # Summarize results.
+    width = max((len(p) for p in projects), default=0)
+    print(f"\n{sum(project_cts.values())} total occurrences of \"{word}\" in {len(projects)} project(s) ({elapsed:.2f} s)")
+    for project, count in project_cts.items():
+        print(f"{project:<{width}}  {count}")
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument(
+        "project",
+        nargs="?",
+        help="the Paratext project to search",
+    )
+    p.add_argument(
+        "word",
+        nargs="?",
+        help="the search term",
+    )
+    p.add_argument(
+        "-a", "--all",
+        action="store_true",
+        help="search all projects; only the search term is then given",
+    )
+    p.add_argument(
+        "-p", "--projects",
+        type=project_list,
+        help="search these comma-separated projects; only the search term is then given",
+    )
+    p.add_argument(
+        "-j", "--jobs",
+        type=positive_int,
+        default=os.cpu_count(),
+        help="number of worker processes when searching several projects",
+    )
+    p.add_argument(
+        "-l", "--lines",
+        action="store_true",
+        help="print matching lines as well as counts when searching several projects",
+    )
+    p.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="rebuild the project's word index from scratch",
+    )
+    args = p.parse_args()
+
+    # Search several projects at once.
+    if args.all or args.projects:
+        word = args.project
+        if word is None or args.word is not None:
+            print(f"Usage: {p.prog} --all|--projects A,B <search term>")
+            exit(1)
+        projects = get_projects(pt_home) if args.all else args.projects
+        missing = [project for project in projects if not (pt_home / project).is_dir()]
+        if missing:
+            print(f"Error: No project \"{missing[0]}\".\n\nPlease choose from this list:")
+            list_projects(pt_home)
+            exit(1)
+        search_projects(projects, word, jobs=args.jobs, show_lines=args.lines)
+        return 0
+
+    # Ensure proper number of arguments passed.
+    if args.project is None or (args.word is None and not args.rebuild):
+        print(f"Usage: {p.prog} [--rebuild] <project name> <search term>")
+        print(f"\nAvailable projects:")
+        list_projects(pt_home)
+        exit(1)
+    project = args.project
+    proj_dir = pt_home / project
+    word = args.word
+
+    # Ensure project exists.
+    if not proj_dir.exists():
+        print(f"Error: No project \"{project}\".\n\nPlease choose one from this list:")
+        list_projects(pt_home)
+        exit(1)
+
+    book_files = get_book_files(proj_dir)
+
+    # Bring the project's index up to date.
+    con = open_index(project)
+    start = time.perf_counter()
+    updated_ct = update_index(con, book_files, rebuild=args.rebuild)
+    if updated_ct:
+        elapsed = time.perf_counter() - start
+        size = (index_dir / f"{project}.sqlite").stat().st_size
+        print(f"Indexed {updated_ct} book(s) in {elapsed:.2f} s; index size: {size / 1024:.0f} KiB")
+    if word is None:
+        return 0
+
+    word_string, word_bytes, word_unicode = get_word_forms(word)
+
+    # Check for search term in book files.
+    word_ct = 0
+    occurrences_dict = {}
+    if is_indexable(word):
+        for name, line_numbers in search_index(con, word).items():
+            book_file = proj_dir / name
+            occurrences_dict[book_file] = line_numbers
+            word_ct += len(line_numbers)
     else:
-        count, matches = count_string_occurrences_in_book(book_file, word)
-    occurrences_dict[book_file] = matches
-    word_ct += count
-
-# Summarize results.
-print(f"{word_ct} total occurrences of \"{word}\" (unicode-escaped: {word_unicode}; bytes: {word_bytes})")
-if word_ct == 0:
-    exit()
-try:
-    input("Press [Enter] to see full results or Ctrl+C to quit. ")
-except KeyboardInterrupt:
-    print()
-    exit(0)
-
-# Print complete results.
-for file_name, lines in occurrences_dict.items():
-    if lines:
-        print(f"\n{file_name}")
-        for line in lines:
-            print(line)
+        for book_file in book_files:
+            book_file, count, matches = search_book(book_file, word)
+            occurrences_dict[book_file] = matches
+            word_ct += count
+    con.close()
+
+    # Summarize results.
+    print(f"{word_ct} total occurrences of \"{word}\" (unicode-escaped: {word_unicode}; bytes: {word_bytes})")
+    if word_ct == 0:
+        return 0
+    try:
+        input("Press [Enter] to see full results or Ctrl+C to quit. ")
+    except KeyboardInterrupt:
+        print()
+        return 0
+
+    # Print complete results.
+    for file_name, lines in occurrences_dict.items():
+        if lines and is_indexable(word):
+            lines = get_lines_from_book(file_name, lines)
+        if lines:
+            print(f"\n{file_name}")
+            verse_index = get_verse_index(file_name)
+            for n, line in lines:
+                print(format_match(verse_index, n, line))
+    return 0
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/python3
+
+"""
+Spell-check the books of a Paratext project against its SpellingStatus.xml,
+listing unknown words and words marked as wrong by how often they occur.
+
+    spell-check.py PROJ                 # ~/Paratext8Projects/PROJ
+    spell-check.py path/to/sfm/folder -s bsc2010/SpellingStatus.xml
+
+Books are read in parallel; each one is reduced to its word counts, so only
+those are passed back to be checked.
+"""
+
+import argparse
+import os
+import time
+
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from spelling import SpellingStatus, iter_words
+from usfm import parse_file
+
+pt_home = Path.home() / "Paratext8Projects"
+
+
+def get_book_files(proj_dir):
+    # Paratext names books e.g. "41MATPROJ.SFM"; also accept plain .sfm files.
+    book_files = [f for f in proj_dir.iterdir() if f.suffix.lower() == '.sfm']
+    book_files.sort()
+    return book_files
+
+def count_book_words(book_file):
+    """Return the book file and a Counter of its (normalized) words."""
+    counts = Counter(w.lower() for w in iter_words(parse_file(book_file)))
+    return book_file, counts
+
+def count_words(book_files, jobs=None):
+    """Return the total word counts and, for each word, the books it's in."""
+    totals = Counter()
+    books = {}
+    if jobs == 1:
+        results = list(map(count_book_words, book_files))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(count_book_words, book_files))
+    for book_file, counts in results:
+        totals.update(counts)
+        for word in counts:
+            books.setdefault(word, []).append(book_file.name[2:5])
+    return totals, books
+
+def show_words(words, totals, books, status, suggest=False):
+    width = max((len(w) for w in words), default=0)
+    for word in words:
+        line = f"{totals[word]:>7}  {word:<{width}}  {' '.join(books[word][:5])}"
+        if len(books[word]) > 5:
+            line += f" (+{len(books[word]) - 5})"
+        if suggest:
+            line += f"  -> {', '.join(status.suggest(word, limit=3))}"
+        print(line)
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument(
+        "project",
+        help="the Paratext project name, or a folder of SFM files",
+    )
+    p.add_argument(
+        "-s", "--spelling-status",
+        help="the SpellingStatus.xml file to use (default: the project's own)",
+    )
+    p.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="number of books to read at the same time",
+    )
+    p.add_argument(
+        "-n", "--number",
+        type=int,
+        default=50,
+        help="list at most this many of the most frequent unknown words (0: all)",
+    )
+    p.add_argument(
+        "-w", "--wrong",
+        action="store_true",
+        help="also list the words marked as wrong, with their corrections",
+    )
+    p.add_argument(
+        "--suggest",
+        action="store_true",
+        help="give spelling suggestions for the unknown words",
+    )
+    args = p.parse_args()
+
+    proj_dir = Path(args.project)
+    if not proj_dir.is_dir():
+        proj_dir = pt_home / args.project
+    if not proj_dir.is_dir():
+        print(f"Error: No project \"{args.project}\".")
+        exit(1)
+    status_file = Path(args.spelling_status) if args.spelling_status else proj_dir / 'SpellingStatus.xml'
+    if not status_file.is_file():
+        print(f"Error: Not a file: {status_file}")
+        exit(1)
+    book_files = get_book_files(proj_dir)
+    if not book_files:
+        print(f"Error: No SFM files in {proj_dir}")
+        exit(1)
+
+    start = time.perf_counter()
+    status = SpellingStatus.load(status_file)
+    load_time = time.perf_counter() - start
+    totals, books = count_words(book_files, jobs=args.jobs)
+    unknown = [w for w, n in totals.most_common() if status.check(w) is None]
+    wrong = [w for w, n in totals.most_common() if status.check(w) == 'W']
+    elapsed = time.perf_counter() - start
+
+    print(f"Unknown: {len(unknown)} words, {sum(totals[w] for w in unknown)} occurrences")
+    show_words(unknown[:args.number or None], totals, books, status, suggest=args.suggest)
+    if args.wrong:
+        print(f"\nWrong: {len(wrong)} words, {sum(totals[w] for w in wrong)} occurrences")
+        for word in wrong:
+            print(f"{totals[word]:>7}  {word} -> {status.corrections.get(word, '?')}")
+
+    print(
+        f"\n{len(book_files)} books, {sum(totals.values())} words ({len(totals)} distinct): "
+        f"{len(unknown)} unknown, {len(wrong)} wrong; "
+        f"{len(status)} words loaded in {load_time:.2f} s, {elapsed:.2f} s in all"
+    )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""
+Spell-checking against a Paratext SpellingStatus.xml file:
+    from spelling import SpellingStatus
+    status = SpellingStatus.load(proj_dir / 'SpellingStatus.xml')
+    status.check('ndeke')           # 'R' (approved), 'W' (wrong) or None (unknown)
+    status.corrections.get('ngbö')  # 'ngbo'
+    status.suggest('ndekke')        # ['ndeke', ...]
+
+Words are compared in lower case and NFC, however the file stores them.
+"""
+
+import regex as re
+import unicodedata
+import xml.etree.ElementTree as ET
+
+# Words may contain medial apostrophes and hyphens, e.g. "a'a", "a-ange", and
+# combining marks, which \w doesn't match, e.g. "kɔ̂rɔ̈".
+word_re = re.compile(r"[\w\p{M}]+(?:['’-][\w\p{M}]+)*")
+# Markers whose content isn't text to be checked.
+skip_markers = {'id', 'ide', 'rem', 'h', 'toc1', 'toc2', 'toc3', 'fr', 'xo'}
+
+
+def normalize_word(word):
+    return unicodedata.normalize('NFC', word).lower()
+
+def get_words(text):
+    """Return the words of a piece of text, in NFC, leaving out numbers."""
+    text = unicodedata.normalize('NFC', text)
+    return [w for w in word_re.findall(text) if not w.isdigit()]
+
+def iter_words(events):
+    """Yield the words of the text of a book's USFM events (see usfm.py)."""
+    for event in events:
+        if event.marker not in skip_markers:
+            yield from get_words(event.text)
+
+
+class SpellingStatus:
+    __slots__ = ('approved', 'wrong', 'corrections', 'specific_cases', '_trie')
+
+    def __init__(self, approved=(), wrong=(), corrections=None, specific_cases=None):
+        self.approved = frozenset(approved)
+        self.wrong = frozenset(wrong)
+        self.corrections = corrections or {} # word: correction
+        self.specific_cases = specific_cases or {} # word: required capitalization
+        self._trie = None
+
+    @classmethod
+    def load(cls, path):
+        """Read the Status elements of the file one at a time."""
+        approved = []
+        wrong = []
+        corrections = {}
+        specific_cases = {}
+        root = None
+        for event, elem in ET.iterparse(path, events=('start', 'end')):
+            if root is None:
+                root = elem
+            if event != 'end' or elem.tag != 'Status':
+                continue
+            word = normalize_word(elem.get('Word', ''))
+            state = elem.get('State')
+            if state == 'R':
+                approved.append(word)
+            elif state == 'W':
+                wrong.append(word)
+            correction = elem.findtext('Correction')
+            if correction:
+                corrections[word] = correction
+            specific_case = elem.findtext('SpecificCase')
+            if specific_case:
+                specific_cases[word] = specific_case
+            root.clear()
+        return cls(approved, wrong, corrections, specific_cases)
+
+    def __len__(self):
+        return len(self.approved) + len(self.wrong)
+
+    def __contains__(self, word):
+        return normalize_word(word) in self.approved
+
+    def check(self, word):
+        """Return 'R' if the word is approved, 'W' if it's marked as wrong, or
+        None if it's unknown."""
+        word = normalize_word(word)
+        if word in self.approved:
+            return 'R'
+        if word in self.wrong:
+            return 'W'
+        return None
+
+    @property
+    def trie(self):
+        """Nested dicts of the approved words' letters, built on first use;
+        the key None marks the end of a word."""
+        if self._trie is None:
+            self._trie = {}
+            for word in self.approved:
+                node = self._trie
+                for c in word:
+                    node = node.setdefault(c, {})
+                node[None] = word
+        return self._trie
+
+    def complete(self, prefix, limit=10):
+        """Return the first `limit` approved words, in sorted order, starting
+        with the prefix."""
+        node = self.trie
+        for c in normalize_word(prefix):
+            node = node.get(c)
+            if node is None:
+                return []
+        # Depth first, a word before its extensions and letters in sorted
+        # order, so the words come out sorted and the walk can stop early.
+        words = []
+        stack = [node]
+        while stack and len(words) < limit:
+            node = stack.pop()
+            if isinstance(node, str):
+                words.append(node)
+                continue
+            stack.extend(node[c] for c in sorted((c for c in node if c is not None), reverse=True))
+            if None in node:
+                stack.append(node[None])
+        return words
+
+    def suggest(self, word, max_distance=2, limit=5):
+        """Return up to `limit` approved words within `max_distance` edits of
+        the word, closest first. A known correction is always given first.
+
+        The Levenshtein distance is computed one trie node at a time, so
+        branches that can't come within max_distance are never visited.
+        """
+        word = normalize_word(word)
+        found = []
+        first_row = list(range(len(word) + 1))
+        stack = [(child, c, first_row) for c, child in self.trie.items() if c is not None]
+        while stack:
+            node, c, prev_row = stack.pop()
+            row = [prev_row[0] + 1]
+            for i, wc in enumerate(word, start=1):
+                row.append(min(
+                    row[i-1] + 1,
+                    prev_row[i] + 1,
+                    prev_row[i-1] + (wc != c),
+                ))
+            if None in node and row[-1] <= max_distance:
+                found.append((row[-1], node[None]))
+            if min(row) <= max_distance:
+                stack.extend((child, k, row) for k, child in node.items() if k is not None)
+        suggestions = [w for d, w in sorted(found) if w != word]
+        correction = self.corrections.get(word)
+        if correction:
+            suggestions = [correction] + [w for w in suggestions if w != correction]
+        return suggestions[:limit]
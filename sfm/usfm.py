@@ -0,0 +1,126 @@
+"""
+Streaming USFM tokenizer shared by the SFM scripts:
+    from usfm import parse_file, to_text
+    for event in parse_file(book_file):
+        if event.marker == 'v':
+            print(event.book, event.chapter, event.verse, event.text)
+
+Each event is a marker (or None for text that continues a previous line) with
+the text that follows it, up to the next marker or the end of the line, and
+the book, chapter and verse it's in. Files are read a line at a time and
+strings are split a line at a time, so the whole document is never copied.
+
+Writing the events back with to_text reproduces the input exactly, except that
+USFM 3 attributes (e.g. "\\w grace|grace\\w*") are written in their full
+form ("\\w grace|lemma="grace"\\w*"). parse_file keeps a file's line endings,
+so write the events with newline='' to reproduce them; a BOM is dropped.
+"""
+
+import re
+
+# A marker, e.g. "\p", "\s1", "\f*", "\+nd", with the space that ends it and,
+#   for chapter and verse markers, their number and its space.
+marker_re = re.compile(r"\\(\+?[A-Za-z0-9-]+\*?|\*)( ?)(?:(?<=\\[cv] )([^\s\\]+)( ?))?")
+attribute_re = re.compile(r'([\w-]+)="([^"]*)"')
+# USFM 3 markers whose default attribute may be given without a name.
+default_attributes = {'w': 'lemma', 'rb': 'gloss', 'xt': 'link-href', 'fig': 'src'}
+
+
+class Event:
+    __slots__ = ('marker', 'number', 'attributes', 'text', 'book', 'chapter', 'verse', 'line', 'raw')
+
+    def __init__(self, marker, text='', number=None, attributes=None, book=None, chapter='0', verse='0', line=0, raw=None):
+        self.marker = marker # e.g. 'v', 'f*', or None for plain text
+        self.number = number # for \c and \v
+        self.attributes = attributes or {} # USFM 3 attributes: name: value
+        self.text = text # includes the line ending of the last event on a line
+        self.book = book
+        self.chapter = chapter
+        self.verse = verse
+        self.line = line
+        self.raw = raw # the marker as written; set to None to write it afresh
+
+    @property
+    def is_end(self):
+        return bool(self.marker) and self.marker.endswith('*')
+
+    def __repr__(self):
+        return f"Event({self.marker!r}, {self.text!r}, {self.book} {self.chapter}:{self.verse})"
+
+
+def split_attributes(marker, text):
+    """Split "word|lemma=\"x\"" into ("word", {'lemma': 'x'})."""
+    text, _, attr_text = text.partition('|')
+    attributes = dict(attribute_re.findall(attr_text))
+    if not attributes and attr_text.strip():
+        attributes[default_attributes.get(marker, 'default')] = attr_text.strip()
+    return text, attributes
+
+def iter_events(lines, book=None):
+    """Yield an Event for each marker, and for any text before the first
+    marker of a line, in an iterable of lines."""
+    chapter = verse = '0'
+    for n, line in enumerate(lines, start=1):
+        m = marker_re.search(line)
+        if m is None or m.start() > 0: # text continued from the previous line
+            end = m.start() if m else len(line)
+            yield Event(None, line[:end], book=book, chapter=chapter, verse=verse, line=n)
+        while m:
+            next_m = marker_re.search(line, m.end())
+            end = next_m.start() if next_m else len(line)
+            marker, number = m.group(1, 3)
+            text = line[m.end():end]
+            attributes = None
+            if marker == 'id' and book is None:
+                book = text[:3]
+            elif marker == 'c' and number:
+                chapter = number
+                verse = '0'
+            elif marker == 'v' and number:
+                verse = number
+            elif '|' in text and next_m and next_m.group(1).endswith('*'):
+                text, attributes = split_attributes(marker, text)
+            yield Event(
+                marker, text, number=number, attributes=attributes,
+                book=book, chapter=chapter, verse=verse, line=n, raw=m.group(0),
+            )
+            m = next_m
+
+def iter_lines(text):
+    """Yield the lines of a string one at a time, with their line endings."""
+    start = 0
+    while start < len(text):
+        end = text.find('\n', start)
+        end = len(text) if end == -1 else end + 1
+        yield text[start:end]
+        start = end
+
+def parse_string(text, book=None):
+    return iter_events(iter_lines(text), book)
+
+def parse_file(path, book=None):
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        yield from iter_events(f, book)
+
+def format_marker(event):
+    if event.raw is not None:
+        return event.raw
+    s = f"\\{event.marker}"
+    if event.number is not None:
+        s += f" {event.number}"
+    if not event.is_end:
+        s += ' '
+    return s
+
+def to_text(events):
+    """Yield the USFM text of the events, one piece at a time."""
+    for event in events:
+        if event.marker is not None:
+            yield format_marker(event)
+        yield event.text
+        if event.attributes:
+            attrs = ' '.join(f'{k}="{v}"' for k, v in event.attributes.items())
+            yield f"|{attrs}"
+
+def write_events(events, f):
+    f.writelines(to_text(events))
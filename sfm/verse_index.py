@@ -0,0 +1,166 @@
+"""
+Chapter and verse index of an SFM book, for reading a verse range directly and
+reporting locations as "BOOK C:V":
+    from verse_index import get_verse_index
+    index = get_verse_index(book_file)
+    index.read('3:16')          # the text of the verse, markers included
+    index.read('3:1', '3:5')    # a range of verses
+    index.read('3')             # a whole chapter
+    index.get_ref(line=42)      # '3:16'
+
+The byte offset and line number of each \\c and \\v are recorded, so a verse is
+found with one dict lookup and read from the memory-mapped file. Indexes are
+cached in ~/Paratext8Projects/_verse-index/PROJECT and rebuilt only when the
+book's size or modification time changes.
+"""
+
+import json
+import mmap
+import os
+import re
+
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+
+pt_home = Path.home() / "Paratext8Projects"
+cache_home = pt_home / "_verse-index"
+
+ref_re = re.compile(rb"^\\id[ \t]+(\S+)|\\([cv])[ \t]+([^\s\\]+)", re.MULTILINE)
+
+
+class VerseIndex:
+    """Entry i is the chapter ('C:0') or verse ('C:V') starting at offsets[i]
+    on lines[i]; it ends where the next entry starts."""
+    __slots__ = ('path', 'mtime', 'size', 'book', 'refs', 'offsets', 'lines', '_positions')
+
+    def __init__(self, path, mtime, size, book, refs, offsets, lines):
+        self.path = Path(path)
+        self.mtime = mtime
+        self.size = size
+        self.book = book
+        self.refs = refs
+        self.offsets = offsets
+        self.lines = lines
+        self._positions = {}
+        for i, ref in enumerate(refs):
+            chapter, verse = ref.split(':')
+            # Bridged verses, e.g. "\v 1-3", can be found by any of their numbers.
+            first, _, last = verse.partition('-')
+            keys = [ref]
+            if first.isdigit() and last.isdigit():
+                keys += [f"{chapter}:{v}" for v in range(int(first), int(last) + 1)]
+            for key in keys:
+                self._positions.setdefault(key, i)
+
+    @classmethod
+    def build(cls, book_file):
+        book_file = Path(book_file).resolve()
+        data = book_file.read_bytes()
+        book = book_file.name[2:5] # e.g. "41MATPROJ.SFM", unless there's an \id
+        refs = []
+        offsets = []
+        lines = []
+        chapter = '0'
+        line = 1
+        last = 0
+        for m in ref_re.finditer(data):
+            line += data.count(b'\n', last, m.start())
+            last = m.start()
+            book_id, marker, number = m.groups()
+            if book_id:
+                book = book_id.decode()
+                continue
+            number = number.decode()
+            if marker == b'c':
+                chapter = number
+                refs.append(f"{chapter}:0")
+            else:
+                refs.append(f"{chapter}:{number}")
+            offsets.append(m.start())
+            lines.append(line)
+        stat = book_file.stat()
+        return cls(book_file, stat.st_mtime, stat.st_size, book, refs, offsets, lines)
+
+    @classmethod
+    def load(cls, index_file):
+        d = json.loads(Path(index_file).read_text())
+        return cls(d['path'], d['mtime'], d['size'], d['book'], d['refs'], d['offsets'], d['lines'])
+
+    def save(self, index_file):
+        index_file = Path(index_file)
+        tmp = index_file.with_suffix('.tmp')
+        tmp.write_text(json.dumps({
+            'path': str(self.path),
+            'mtime': self.mtime,
+            'size': self.size,
+            'book': self.book,
+            'refs': self.refs,
+            'offsets': self.offsets,
+            'lines': self.lines,
+        }))
+        os.replace(tmp, index_file)
+
+    def is_current(self):
+        stat = self.path.stat()
+        return (self.mtime, self.size) == (stat.st_mtime, stat.st_size)
+
+    def get_position(self, ref):
+        """Return the entry number of a "C:V" or "C" (whole chapter) reference."""
+        if ':' not in ref:
+            ref = f"{ref}:0"
+        try:
+            return self._positions[ref]
+        except KeyError:
+            raise KeyError(f"No {self.book} {ref} in {self.path.name}") from None
+
+    def get_span(self, start, end=None):
+        """Return the start and end byte offsets of a reference or range."""
+        last = end or start
+        i = self.get_position(start)
+        j = self.get_position(last) + 1
+        if ':' not in last: # a whole chapter runs until the next one
+            while j < len(self.refs) and not self.refs[j].endswith(':0'):
+                j += 1
+        end_offset = self.offsets[j] if j < len(self.offsets) else self.size
+        return self.offsets[i], end_offset
+
+    def read(self, start, end=None):
+        """Return the text from the start reference to the end of the end
+        reference (or of the start one)."""
+        start_offset, end_offset = self.get_span(start, end)
+        if start_offset >= end_offset: # an empty file can't be mapped
+            return ''
+        with open(self.path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return mm[start_offset:end_offset].decode('utf-8')
+
+    def get_ref(self, line=None, offset=None):
+        """Return the "C:V" reference of a line number (the first verse that
+        starts on it, or else the one it continues) or of a byte offset."""
+        if line is not None:
+            i = bisect_left(self.lines, line)
+            if i < len(self.lines) and self.lines[i] == line:
+                return self.refs[i]
+        else:
+            i = bisect_right(self.offsets, offset)
+        return self.refs[i-1] if i else '0:0'
+
+
+def get_index_file(book_file, cache_dir=None):
+    book_file = Path(book_file).resolve()
+    if cache_dir is None:
+        cache_dir = cache_home / book_file.parent.name
+    return Path(cache_dir) / f"{book_file.name}.json"
+
+def get_verse_index(book_file, cache_dir=None):
+    """Return the book's cached index, rebuilding it if the book has changed."""
+    index_file = get_index_file(book_file, cache_dir)
+    if index_file.is_file():
+        index = VerseIndex.load(index_file)
+        # Books of projects in folders with the same name share a cache file.
+        if index.path == Path(book_file).resolve() and index.is_current():
+            return index
+    index = VerseIndex.build(book_file)
+    index_file.parent.mkdir(parents=True, exist_ok=True)
+    index.save(index_file)
+    return index
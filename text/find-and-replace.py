@@ -1,66 +1,271 @@
 #!/usr/bin/env python3
 """
 Search for a term in a text file. Optionally, replace it with another term.
+
+A rules file can be given instead of a term to apply many replacements in a
+single pass over each file. Rules files are either TSV, with one
+"find<TAB>replace<TAB>flags" rule per line (lines starting with "#" are
+ignored), or JSON, as a list of {"find": ..., "replace": ..., "flags": ...}
+objects. Flags are optional: "i" ignores case, "r" treats the rule as a regex
+instead of literal text.
+
+All literal rules are combined into one matcher and applied together, so they
+don't see each other's replacements. Regex rules are then applied one by one,
+in file order.
 """
 
 import argparse
+import json
+import os
 import re
+import shutil
+import sys
+import tempfile
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 
 
 def get_lines(file):
-    with open(file, 'r') as f:
-        lines = f.readlines()
-    return lines
-
-def show_results(results, type):
-    for file, findings in results.items():
-        if type == 'find':
-            print(f"\n{file}")
-        for n, l in findings.items():
-            if type == 'find':
-                print(f"{n}: {l.strip()}")
-            elif type == 'replace':
-                print(f"{l.strip()}")
+    # Lines are read one at a time so that large files aren't held in memory,
+    #   and with their line endings as they are, so that they're written back
+    #   unchanged.
+    with open(file, 'r', encoding='utf-8', newline='') as f:
+        yield from f
 
-def update_lines(term, replace, lines, ignore_case):
+def compile_term(term, ignore_case):
     flags = 0
     if ignore_case:
         flags = re.IGNORECASE
-    fcomp = re.compile(rf"{term}", flags=flags)
-    updated_lines = {}
-    for i, line in enumerate(lines):
-        updated_line = replace_term(fcomp, replace, line)
-        updated_lines[i] = updated_line
-    return updated_lines
+    return re.compile(rf"{term}", flags=flags)
 
-def find_term(term, lines, ignore_case):
-    findings = {}
-    pattern = rf"{term}"
-    flags = 0
-    if ignore_case:
-        flags = re.IGNORECASE
+def show_findings(file, findings):
+    print(f"\n{file}")
+    for n, l in findings:
+        print(f"{n}: {l.strip()}")
+
+def update_lines(fcomp, replace, lines, counter=None):
+    for line in lines:
+        updated_line, ct = fcomp.subn(replace, line)
+        if ct and counter is not None:
+            counter[0] += 1
+        yield updated_line
+
+def find_term(fcomp, lines):
     for i, line in enumerate(lines):
-        results = re.findall(pattern, line, flags=flags)
-        if results:
-            findings[i+1] = line
-    return findings
+        if fcomp.search(line):
+            yield i+1, line
+
+def write_lines(lines, outfile, mode_from=None):
+    # Write to a temporary file next to the output, then move it into place,
+    #   so that an interrupted run never leaves a half-written file.
+    outfile = Path(outfile)
+    fd, tmp = tempfile.mkstemp(dir=outfile.parent, prefix=f".{outfile.name}.")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            f.writelines(lines)
+        if mode_from is not None:
+            shutil.copymode(mode_from, tmp)
+        os.replace(tmp, outfile)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+def read_rules(rules_file):
+    """Return a list of (find, replace, flags) tuples from a TSV or JSON file."""
+    rules_file = Path(rules_file)
+    if rules_file.suffix.lower() == '.json':
+        data = json.loads(rules_file.read_text())
+        return [(r['find'], r.get('replace', ''), r.get('flags', '')) for r in data]
+    rules = []
+    for line in get_lines(rules_file):
+        line = line.rstrip('\r\n')
+        if not line or line.startswith('#'):
+            continue
+        fields = line.split('\t') + ['', '']
+        rules.append((fields[0], fields[1], fields[2]))
+    return rules
+
+def trie_pattern(words):
+    """Build a regex matching any of the words, with shared prefixes merged
+    so that matching cost doesn't grow with the number of words."""
+    trie = {}
+    for word in words:
+        node = trie
+        for c in word:
+            node = node.setdefault(c, {})
+        node[''] = True
+
+    def build(node):
+        branches = [re.escape(c) + build(child) for c, child in sorted(node.items()) if c]
+        if not branches:
+            return ''
+        if len(branches) == 1 and '' not in node:
+            return branches[0]
+        pattern = f"(?:{'|'.join(branches)})"
+        if '' in node: # a word ends here, but longer matches are preferred
+            pattern += '?'
+        return pattern
+
+    return build(trie)
+
+class RuleSet:
+    def __init__(self, rules):
+        self.rules = rules
+        self.hits = [0] * len(rules)
+        self.times = [0.0] * len(rules)
+        self.literal_time = 0.0
+        self.literals = {}
+        self.literals_i = {}
+        self.regexes = []
+        for i, (find, replace, flags) in enumerate(rules):
+            if not find:
+                continue
+            if 'r' in flags:
+                self.regexes.append((i, compile_term(find, 'i' in flags), replace))
+            elif 'i' in flags:
+                self.literals_i.setdefault(find.lower(), i)
+            else:
+                self.literals.setdefault(find, i)
+        parts = []
+        if self.literals:
+            parts.append(f"(?P<cs>{trie_pattern(self.literals)})")
+        if self.literals_i:
+            parts.append(f"(?i:(?P<ci>{trie_pattern(self.literals_i)}))")
+        self.literal_re = re.compile('|'.join(parts)) if parts else None
+
+    def replace_literal(self, m):
+        if m.lastgroup == 'cs':
+            i = self.literals[m.group()]
+        else:
+            i = self.literals_i[m.group().lower()]
+        self.hits[i] += 1
+        return self.rules[i][1]
+
+    def apply(self, line):
+        if self.literal_re:
+            start = time.perf_counter()
+            line = self.literal_re.sub(self.replace_literal, line)
+            self.literal_time += time.perf_counter() - start
+        for i, fcomp, replace in self.regexes:
+            start = time.perf_counter()
+            line, ct = fcomp.subn(replace, line)
+            self.hits[i] += ct
+            self.times[i] += time.perf_counter() - start
+        return line
+
+def apply_rules(rule_set, lines, counter=None):
+    for line in lines:
+        updated_line = rule_set.apply(line)
+        if counter is not None and updated_line != line:
+            counter[0] += 1
+        yield updated_line
+
+def get_outfile(file, outdir=None):
+    return Path(outdir) / Path(file).name if outdir else Path(file)
+
+def get_unique_files(files, outdir=None):
+    """Return the files, leaving out any given more than once; exit with an
+    error if two different files would be written to the same output file."""
+    outfiles = {}
+    for file in files:
+        same_name = outfiles.setdefault(get_outfile(file, outdir).resolve(), [])
+        if not any(Path(f).resolve() == Path(file).resolve() for f in same_name):
+            same_name.append(file)
+    duplicates = {outfile: files for outfile, files in outfiles.items() if len(files) > 1}
+    if duplicates:
+        for outfile, files in duplicates.items():
+            print(f"Error: {', '.join(map(str, files))} would all be written to {outfile}", file=sys.stderr)
+        exit(1)
+    return [file for file, in outfiles.values()]
+
+def apply_rules_to_file(file, rules, outdir=None):
+    """Write the updated file in place or to outdir; return the number of
+    lines changed with the rule hit counts and timings."""
+    rule_set = RuleSet(rules)
+    outfile = get_outfile(file, outdir)
+    counter = [0]
+    write_lines(apply_rules(rule_set, get_lines(file), counter), outfile, mode_from=file)
+    return counter[0], rule_set.hits, rule_set.times, rule_set.literal_time
 
-def replace_term(fcomp, replace, line):
-    new_line = fcomp.sub(replace, line)
-    return new_line
+def show_rule_stats(rules, hits, times, literal_time):
+    out = sys.stderr
+    print(f"\n{'rule':>5} {'hits':>8} {'seconds':>9}  find -> replace", file=out)
+    if any('r' not in flags for find, replace, flags in rules):
+        print(f"{'lit.':>5} {'':>8} {literal_time:>9.3f}  (all literal rules)", file=out)
+    for i, (find, replace, flags) in enumerate(rules):
+        t = f"{times[i]:>9.3f}" if 'r' in flags else f"{'':>9}"
+        print(f"{i+1:>5} {hits[i]:>8} {t}  {find} -> {replace}", file=out)
+
+def find_in_file(file, term, ignore_case):
+    fcomp = compile_term(term, ignore_case)
+    return list(find_term(fcomp, get_lines(file)))
+
+def replace_in_file(file, term, replace, ignore_case, outdir=None):
+    """Write the updated file in place or to outdir; return the number of lines changed."""
+    fcomp = compile_term(term, ignore_case)
+    outfile = get_outfile(file, outdir)
+    counter = [0]
+    write_lines(update_lines(fcomp, replace, get_lines(file), counter), outfile, mode_from=file)
+    return counter[0]
+
+def run_rules(args):
+    rules = read_rules(args.rules)
+    # With --rules there's no term, so the first positional is a file.
+    files = [args.term, *args.files]
+    if not args.write and not args.output_dir:
+        rule_set = RuleSet(rules)
+        for file in files:
+            for l in apply_rules(rule_set, get_lines(file)):
+                print(f"{l.strip()}")
+        show_rule_stats(rules, rule_set.hits, rule_set.times, rule_set.literal_time)
+        return 0
+
+    files = get_unique_files(files, args.output_dir)
+    if args.output_dir:
+        Path(args.output_dir).mkdir(parents=True, exist_ok=True)
+    hits = [0] * len(rules)
+    times = [0.0] * len(rules)
+    literal_time = 0.0
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        results = executor.map(
+            apply_rules_to_file,
+            files,
+            [rules] * len(files),
+            [args.output_dir] * len(files),
+        )
+        for file, (ct, file_hits, file_times, file_literal_time) in zip(files, results):
+            print(f"{file}: {ct} line(s) changed")
+            hits = [a + b for a, b in zip(hits, file_hits)]
+            times = [a + b for a, b in zip(times, file_times)]
+            literal_time += file_literal_time
+    show_rule_stats(rules, hits, times, literal_time)
+    return 0
+
+def positive_int(string):
+    n = int(string)
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1: {n}")
+    return n
 
 def main():
     p = argparse.ArgumentParser()
     p.add_argument(
         "term",
-        help="the term to search for",
+        nargs="?",
+        help="the term to search for (omit when using --rules)",
     )
     p.add_argument(
         "files",
         metavar="file",
-        nargs="+",
+        nargs="*",
         help="the file(s) to be searched",
     )
+    p.add_argument(
+        "-R", "--rules",
+        help="apply all replacements from this TSV or JSON rules file",
+    )
     p.add_argument(
         "-i", "--ignore-case",
         action="store_true",
@@ -70,23 +275,66 @@ def main():
         "-r", "--replace",
         help="the replacement term",
     )
+    p.add_argument(
+        "-w", "--write",
+        action="store_true",
+        help="write replacements back to the file(s) instead of printing them",
+    )
+    p.add_argument(
+        "-o", "--output-dir",
+        help="write replaced file(s) to this folder instead of printing them",
+    )
+    p.add_argument(
+        "-j", "--jobs",
+        type=positive_int,
+        default=os.cpu_count(),
+        help="number of files to process at the same time",
+    )
     args = p.parse_args()
 
     # Handle commandline arguments.
+    if args.rules:
+        if args.term is None:
+            p.error("at least one file is required with --rules")
+        if args.ignore_case or args.replace is not None:
+            p.error("-i/--ignore-case and -r/--replace can't be used with --rules; give them in the rules file")
+        return run_rules(args)
+    if args.term is None or not args.files:
+        p.error("the following arguments are required: term, file")
+
     if args.replace is None:
-        results = {}
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            results = executor.map(
+                find_in_file,
+                args.files,
+                [args.term] * len(args.files),
+                [args.ignore_case] * len(args.files),
+            )
+            for file, findings in zip(args.files, results):
+                show_findings(file, findings)
+        return 0
+
+    if not args.write and not args.output_dir:
+        fcomp = compile_term(args.term, args.ignore_case)
         for file in args.files:
-            lines = get_lines(file)
-            results[file] = find_term(args.term, lines, args.ignore_case)
-        show_results(results, 'find')
+            for l in update_lines(fcomp, args.replace, get_lines(file)):
+                print(f"{l.strip()}")
         return 0
 
-    results = {}
-    for file in args.files:
-        lines = get_lines(file)
-        updated_lines = update_lines(args.term, args.replace, lines, args.ignore_case)
-        results[file] = updated_lines
-    show_results(results, 'replace')
+    files = get_unique_files(args.files, args.output_dir)
+    if args.output_dir:
+        Path(args.output_dir).mkdir(parents=True, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        results = executor.map(
+            replace_in_file,
+            files,
+            [args.term] * len(files),
+            [args.replace] * len(files),
+            [args.ignore_case] * len(files),
+            [args.output_dir] * len(files),
+        )
+        for file, ct in zip(files, results):
+            print(f"{file}: {ct} line(s) changed")
     return 0
 
 if __name__ == '__main__':
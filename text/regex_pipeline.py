@@ -0,0 +1,52 @@
+"""
+Precompiled chains of regex substitutions.
+
+A Pipeline is built once (e.g. at import) and can then be run over any number
+of texts; it can also keep per-stage match counts and timings.
+"""
+
+import regex as re
+# import re # look-behind requires fixed-width pattern
+import time
+
+
+class Stage:
+    def __init__(self, description, pattern, repl, flags=0):
+        self.description = description
+        self.pattern = re.compile(pattern, flags=flags)
+        self.repl = repl
+
+    def apply(self, text):
+        return self.pattern.subn(self.repl, text)
+
+
+class Pipeline:
+    def __init__(self, stages):
+        self.stages = stages
+
+    def run(self, text, stats=None):
+        """Apply each stage in turn. If a stats list is given, each stage's
+        [match count, seconds] totals are added to it."""
+        if stats is not None and not stats:
+            stats.extend([0, 0.0] for s in self.stages)
+        for i, stage in enumerate(self.stages):
+            start = time.perf_counter()
+            text, ct = stage.apply(text)
+            if stats is not None:
+                stats[i][0] += ct
+                stats[i][1] += time.perf_counter() - start
+        return text
+
+    def show_stats(self, stats):
+        print(f"{'matches':>8} {'seconds':>9}  stage")
+        for stage, (ct, secs) in zip(self.stages, stats):
+            print(f"{ct:>8} {secs:>9.3f}  {stage.description}")
+        print(f"{sum(s[0] for s in stats):>8} {sum(s[1] for s in stats):>9.3f}  total")
+
+
+def add_stats(total, stats):
+    if not total:
+        total.extend([0, 0.0] for s in stats)
+    for t, (ct, secs) in zip(total, stats):
+        t[0] += ct
+        t[1] += secs
@@ -2,64 +2,80 @@
 
 # Convert plain text document (Biblical book) with chapter and verse numbers to SFM format.
 
-import regex as re
-import sys
+import argparse
 
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+from regex_pipeline import add_stats
+from txt_to_sfm import FootnotesError, convert_file, pipeline
 
-def has_footnotes(text):
-    # Assumes footnote text looks like: "a 1.11 footnote text"
-    matched_string = re.search(r'^[a-z] [0-9]+\.[0-9]+', text, flags=re.MULTILINE)
-    return matched_string is not None
 
+def get_txt_files(paths):
+    txt_files = []
+    for path in paths:
+        path = Path(path).expanduser()
+        if path.is_dir():
+            txt_files.extend(sorted(path.glob('*.txt')))
+        else:
+            txt_files.append(path)
+    return txt_files
 
-# Handle args.
-if '-h' in sys.argv or '--help' in sys.argv:
-    print(f"{sys.argv[0]} INFILE.txt")
-    print("\nThis script will add SFM markers to text in INFILE.txt and output INFILE.sfm.")
-    exit()
+def convert_one(txt_file):
+    # Worker function: returns (txt_file, sfm_file, error, stats).
+    stats = []
+    try:
+        sfm_file = convert_file(txt_file, stats)
+    except FootnotesError as e:
+        return txt_file, None, e, stats
+    return txt_file, sfm_file, None, stats
 
-# Handle infile and outfile.
-txt_file = Path(sys.argv[1]).expanduser().resolve()
-sfm_file = txt_file.with_suffix('.sfm')
 
-# Slurp infile.
-text = txt_file.read_text()
-if has_footnotes(text):
-    print("WARNING: This script doesn't handle footnotes. Move them inline first; e.g. \"\\f + \\fr #.# \\ft text \\fq quote \\f*\"")
-    exit(1)
+def main():
+    p = argparse.ArgumentParser(
+        description="This script will add SFM markers to text in INFILE.txt and output INFILE.sfm.",
+    )
+    p.add_argument(
+        "infiles",
+        metavar="INFILE.txt",
+        nargs="+",
+        help="the text file(s) to convert, or folder(s) of .txt files",
+    )
+    p.add_argument(
+        "-t", "--timings",
+        action="store_true",
+        help="show match counts and time spent for each conversion stage",
+    )
+    p.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=1,
+        help="number of files to convert at the same time",
+    )
+    args = p.parse_args()
 
-# GENERAL CLEANUP
-# Remove repeated spaces.
-text = re.sub(r' {2,}', r' ', text)
-# Remove spaces from otherwise empty lines.
-text = re.sub(r'^ *$', r'', text, flags=re.MULTILINE)
-# Remove spaces from either end of lines.
-text = re.sub(r'^ *(.*) *$', r'\1', text, flags=re.MULTILINE)
-# Remove text from lines that start with 2 or more capital letters (i.e. page titles/numbers).
-text = re.sub(r'\n+\d*\s*[[:upper:]]{2}.*\n+(?:\d*\s*[[:upper:]]{2}.*\n+)*', r'\n', text)
+    txt_files = get_txt_files(args.infiles)
+    total_stats = []
+    errors = 0
+    if args.jobs > 1 and len(txt_files) > 1:
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            results = list(executor.map(convert_one, txt_files))
+    else:
+        results = map(convert_one, txt_files)
+    for txt_file, sfm_file, error, stats in results:
+        if error:
+            print(f"{txt_file}: WARNING: {error}")
+            errors += 1
+            continue
+        if len(txt_files) > 1:
+            print(sfm_file)
+        add_stats(total_stats, stats)
 
-# ADD SFM MARKERS
-# Add \c chapter markers.
-text = re.sub(r'^(?=[0-9]+$)', r'\\c ', text, flags=re.MULTILINE)
-# Add \v verse markers for line-start verse numbers.
-text = re.sub(r'^(?=[0-9]+ .)', r'\\v ', text, flags=re.MULTILINE)
-# Add \v verse markers for mid-line verse numbers.
-text = re.sub(r'(?<!\\v)(?= [0-9]+ )', r'\n\\v', text)
-# Add \s1 section titles markers to single non-marked lines, double-spaced before and after.
-text = re.sub(r'(?<=\n{2}|^\n)(?=[^\\].*\n{2})', r'\\s1 ', text)
-# Add \p paragraph markers with newline before double text lines, double-spaced before, starting with a verse marker.
-text = re.sub(r'(?<=\n{2}|^\n)(?=\\v.*\n.)', r'\\p\n', text)
-# Add \p paragraph markers before double text lines, double-spaced before, starting with text.
-text = re.sub(r'(?<=\n{2}|^\n)(?=[^\\v\s].*\n.)', r'\\p ', text)
-# Remove mid-sentence line breaks.
-text = re.sub(r'(?<!\\p|\\c \d+|\n)\n(?!\s|\\)', r' ', text)
+    if args.timings and total_stats:
+        print()
+        pipeline.show_stats(total_stats)
+    if errors:
+        exit(1)
 
-# FINAL CLEANUP
-# Swap section titles and chapter number lines if in wrong order.
-text = re.sub(r'(\\s[^\n]+\n+)(\\c[^\n]+\n+)', r'\2\1', text)
-# Remove repeated newlines.
-text = re.sub(r'\n+', r'\n', text)
-# Write outfile.
-sfm_file.write_text(text)
\ No newline at end of file
+if __name__ == '__main__':
+    main()
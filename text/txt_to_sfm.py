@@ -0,0 +1,71 @@
+"""
+Conversion pipeline used by txt-to-sfm.py; import it to convert many books in
+one process:
+
+    from txt_to_sfm import convert_file
+    for f in Path('NT').glob('*.txt'):
+        convert_file(f)
+"""
+
+import regex as re
+# import re # look-behind requires fixed-width pattern
+
+from pathlib import Path
+
+from regex_pipeline import Pipeline, Stage
+
+
+class FootnotesError(Exception):
+    pass
+
+
+pipeline = Pipeline([
+    # GENERAL CLEANUP
+    Stage("Remove repeated spaces.", r' {2,}', r' '),
+    Stage("Remove spaces from otherwise empty lines.", r'^ *$', r'', re.MULTILINE),
+    Stage("Remove spaces from either end of lines.", r'^ *(.*) *$', r'\1', re.MULTILINE),
+    Stage(
+        "Remove text from lines that start with 2 or more capital letters (i.e. page titles/numbers).",
+        r'\n+\d*\s*[[:upper:]]{2}.*\n+(?:\d*\s*[[:upper:]]{2}.*\n+)*', r'\n'
+    ),
+
+    # ADD SFM MARKERS
+    Stage("Add \\c chapter markers.", r'^(?=[0-9]+$)', r'\\c ', re.MULTILINE),
+    Stage("Add \\v verse markers for line-start verse numbers.", r'^(?=[0-9]+ .)', r'\\v ', re.MULTILINE),
+    Stage("Add \\v verse markers for mid-line verse numbers.", r'(?<!\\v)(?= [0-9]+ )', r'\n\\v'),
+    Stage(
+        "Add \\s1 section titles markers to single non-marked lines, double-spaced before and after.",
+        r'(?<=\n{2}|^\n)(?=[^\\].*\n{2})', r'\\s1 '
+    ),
+    Stage(
+        "Add \\p paragraph markers with newline before double text lines, double-spaced before, starting with a verse marker.",
+        r'(?<=\n{2}|^\n)(?=\\v.*\n.)', r'\\p\n'
+    ),
+    Stage(
+        "Add \\p paragraph markers before double text lines, double-spaced before, starting with text.",
+        r'(?<=\n{2}|^\n)(?=[^\\v\s].*\n.)', r'\\p '
+    ),
+    Stage("Remove mid-sentence line breaks.", r'(?<!\\p|\\c \d+|\n)\n(?!\s|\\)', r' '),
+
+    # FINAL CLEANUP
+    Stage("Swap section titles and chapter number lines if in wrong order.", r'(\\s[^\n]+\n+)(\\c[^\n]+\n+)', r'\2\1'),
+    Stage("Remove repeated newlines.", r'\n+', r'\n'),
+])
+
+
+def has_footnotes(text):
+    # Assumes footnote text looks like: "a 1.11 footnote text"
+    matched_string = re.search(r'^[a-z] [0-9]+\.[0-9]+', text, flags=re.MULTILINE)
+    return matched_string is not None
+
+def convert_text(text, stats=None):
+    if has_footnotes(text):
+        raise FootnotesError("This script doesn't handle footnotes. Move them inline first; e.g. \"\\f + \\fr #.# \\ft text \\fq quote \\f*\"")
+    return pipeline.run(text, stats)
+
+def convert_file(txt_file, stats=None):
+    """Write INFILE.sfm next to INFILE.txt and return its path."""
+    txt_file = Path(txt_file).expanduser().resolve()
+    sfm_file = txt_file.with_suffix('.sfm')
+    sfm_file.write_text(convert_text(txt_file.read_text(), stats))
+    return sfm_file
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+
+"""
+Convert videos to H.263 3GP files for feature phones, several at a time.
+
+Each file is converted with a profile giving its H.263 resolution and
+orientation: the one given with --profile, or the one for its name in a
+--profiles table. A table has a file name (or glob pattern) and a profile on
+each line; the first matching line wins:
+    # pattern           profile
+    *-portrait.mp4      portrait
+    intro.mp4           cif
+
+Outputs that are newer than their inputs are skipped. For each file converted,
+the length of the video, the time taken and the speed (video seconds per
+second) are logged.
+
+To try it out, make a few small test videos and convert them:
+    ./convert-to-3gp.py --make-test-videos /tmp/3gp-test
+    ./convert-to-3gp.py -o /tmp/3gp-test/out /tmp/3gp-test/*.mp4
+"""
+
+import argparse
+import fnmatch
+import os
+import re
+import subprocess
+import sys
+import time
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+FRAMERATE = 23 # fps
+
+# H263 resolutions.
+sizes = {
+    'sqcif': (128, 96),
+    'qcif': (176, 144),
+    'cif': (352, 288),
+    '4cif': (704, 576),
+    '16cif': (1408, 1152),
+}
+
+# ffmpeg rotation ("transpose") options:
+# 0 = 90° counterclockwise and vertical flip
+# 1 = 90° clockwise
+# 2 = 90° counterclockwise
+# 3 = 90° clockwise and vertical flip
+
+# Profile name -> (scale, transpose). Portrait videos are fitted to the
+# rotated frame, then turned to fill the (landscape) H.263 frame.
+profiles = {}
+for name, (w, h) in sizes.items():
+    profiles[name] = (f"{w}:{h}", None)
+    profiles[f"{name}-portrait"] = (f"{h}:{w}", 2)
+profiles['landscape'] = profiles['4cif']
+profiles['portrait'] = profiles['4cif-portrait']
+
+
+def read_profile_table(path):
+    """Return a list of (pattern, profile name) from a profiles table."""
+    table = []
+    with open(path, encoding='utf-8') as f:
+        for n, line in enumerate(f, start=1):
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            fields = line.rsplit(None, 1)
+            pattern, name = fields if len(fields) == 2 else ('', '')
+            if name not in profiles:
+                print(f"Error: {path}:{n}: Expected a pattern and one of: {', '.join(profiles)}", file=sys.stderr)
+                exit(1)
+            table.append((pattern, name))
+    return table
+
+
+def get_profile(infile, table, default):
+    for pattern, name in table:
+        if fnmatch.fnmatch(infile.name, pattern) or fnmatch.fnmatch(str(infile), pattern):
+            return name
+    return default
+
+
+def get_filter(profile):
+    scale, transpose = profiles[profile]
+    vf = f"scale={scale}:force_original_aspect_ratio=1,pad={scale}:(ow-iw)/2:(oh-ih)/2"
+    if transpose is not None:
+        vf += f",transpose={transpose}"
+    return vf
+
+
+def is_up_to_date(outfile, infile):
+    try:
+        return outfile.stat().st_mtime >= infile.stat().st_mtime
+    except FileNotFoundError:
+        return False
+
+
+def get_duration(ffmpeg_log):
+    # e.g. "  Duration: 00:01:02.50, start: ..."
+    m = re.search(r'Duration: (\d+):(\d\d):(\d\d(?:\.\d+)?)', ffmpeg_log)
+    if not m:
+        return None
+    h, mi, s = m.groups()
+    return int(h) * 3600 + int(mi) * 60 + float(s)
+
+
+def convert_file(infile, outfile, profile, framerate=FRAMERATE):
+    """Convert infile to outfile by way of a temporary file; returns the
+    length of the video in seconds (or None if unknown)."""
+    tmp = outfile.with_name(f".{outfile.name}.part")
+    cmd = [
+        'ffmpeg', '-nostdin', '-y', '-i', str(infile),
+        '-vf', get_filter(profile),
+        '-r', str(framerate), '-ar', '8000', '-ab', '4750', '-ac', '1',
+        # Each job gets one core; the scheduler runs the jobs in parallel.
+        '-threads', '1',
+        '-f', '3gp', str(tmp),
+    ]
+    try:
+        r = subprocess.run(cmd, capture_output=True, text=True, errors='replace')
+        if r.returncode != 0:
+            raise RuntimeError(r.stderr.strip().splitlines()[-1] if r.stderr.strip() else f"ffmpeg exited with {r.returncode}")
+        os.replace(tmp, outfile)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return get_duration(r.stderr)
+
+
+def convert_files(jobs, workers, framerate=FRAMERATE):
+    """Run the (infile, outfile, profile) jobs, at most `workers` at a time,
+    logging each one as it finishes. Returns the number that failed."""
+    def run(infile, outfile, profile):
+        start = time.perf_counter()
+        duration = convert_file(infile, outfile, profile, framerate)
+        return duration, time.perf_counter() - start
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run, *j): j for j in jobs}
+        for future in as_completed(futures):
+            infile, outfile, profile = futures[future]
+            try:
+                duration, elapsed = future.result()
+            except (OSError, RuntimeError) as e:
+                print(f"Error: {infile}: {e}", file=sys.stderr)
+                failed += 1
+                continue
+            if duration:
+                print(f"{outfile.name} ({profile}): {duration:.1f} s of video in {elapsed:.1f} s ({duration / elapsed:.1f}x)")
+            else:
+                print(f"{outfile.name} ({profile}): {elapsed:.1f} s")
+    return failed
+
+
+def make_test_videos(outdir, duration=2):
+    """Make small landscape and portrait test videos with ffmpeg's built-in
+    test sources."""
+    outdir.mkdir(parents=True, exist_ok=True)
+    for name, size in (('landscape', '320x240'), ('wide', '426x240'), ('tall-portrait', '240x320')):
+        outfile = outdir / f"test-{name}.mp4"
+        subprocess.run(
+            [
+                'ffmpeg', '-nostdin', '-y', '-loglevel', 'error',
+                '-f', 'lavfi', '-i', f"testsrc=size={size}:rate=25:duration={duration}",
+                '-f', 'lavfi', '-i', f"sine=frequency=440:duration={duration}",
+                '-c:v', 'mpeg4', '-c:a', 'aac', '-shortest', str(outfile),
+            ],
+            check=True,
+        )
+        print(outfile)
+    # A table giving the portrait video its own profile.
+    table = outdir / 'profiles.txt'
+    table.write_text("*portrait*    qcif-portrait\n")
+    print(table)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "infiles",
+        nargs='*',
+        type=Path,
+        help="the videos to convert",
+    )
+    parser.add_argument(
+        "-o", "--outdir",
+        type=Path,
+        default=Path.cwd(),
+        help="folder for the 3GP files (default: current folder)",
+    )
+    parser.add_argument(
+        "-p", "--profile",
+        choices=profiles,
+        default='landscape',
+        help="resolution and orientation for files not in the --profiles table (default: landscape, i.e. 4cif)",
+    )
+    parser.add_argument(
+        "--profiles",
+        metavar="FILE",
+        help="table of file name patterns and their profiles",
+    )
+    parser.add_argument(
+        "-r", "--framerate",
+        type=int,
+        default=FRAMERATE,
+        help=f"frames per second (default: {FRAMERATE})",
+    )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="number of files to convert at the same time (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "-f", "--force",
+        action="store_true",
+        help="convert files even if their 3GP files are up to date",
+    )
+    parser.add_argument(
+        "--make-test-videos",
+        metavar="DIR",
+        type=Path,
+        help="make a few small test videos and a profiles table in DIR, then exit",
+    )
+    args = parser.parse_args()
+
+    if args.make_test_videos:
+        make_test_videos(args.make_test_videos)
+        return
+    if not args.infiles:
+        parser.error("no input files given")
+
+    table = read_profile_table(args.profiles) if args.profiles else []
+    args.outdir.mkdir(parents=True, exist_ok=True)
+    # Files with the same name in different folders would be converted to the
+    # same 3GP file at the same time.
+    outfiles = {}
+    for infile in args.infiles:
+        same_name = outfiles.setdefault(args.outdir / f"{infile.stem}.3gp", [])
+        if not any(f.resolve() == infile.resolve() for f in same_name):
+            same_name.append(infile)
+    duplicates = {outfile: infiles for outfile, infiles in outfiles.items() if len(infiles) > 1}
+    if duplicates:
+        for outfile, infiles in duplicates.items():
+            print(f"Error: {', '.join(map(str, infiles))} would all be converted to {outfile}", file=sys.stderr)
+        exit(1)
+
+    jobs = []
+    skipped = 0
+    for outfile, (infile,) in outfiles.items():
+        if not args.force and is_up_to_date(outfile, infile):
+            skipped += 1
+            continue
+        jobs.append((infile, outfile, get_profile(infile, table, args.profile)))
+
+    start = time.perf_counter()
+    failed = convert_files(jobs, args.jobs, args.framerate)
+    elapsed = time.perf_counter() - start
+    print(f"{len(jobs) - failed} converted, {skipped} up to date, {failed} failed in {elapsed:.1f} s")
+    if failed:
+        exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -7,6 +7,8 @@ import requests
 
 from pathlib import Path
 
+from lfl_odt import make_odt
+
 # The site is organized by language then lesson; e.g.
 # lfl_api / language / [2,5] / lessons / [1-112]
 # language 2 == French; language 5 == Sango
@@ -14,3 +16,9 @@ lfl_api = "https://luke.silcameroon.org/api"
 lfl_data = Path(__file__).resolve().parent / 'lfl-data'
 lfl_data.mkdir(exist_ok=True)
 outfile = lfl_data / f"Lessons from Luke - Sango.odt"
+
+data_files = [f for f in lfl_data.glob('*.csv')]
+if not data_files:
+    print(f"Error: No CSV files in {lfl_data}")
+    exit(1)
+make_odt(data_files, outfile)
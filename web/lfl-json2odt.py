@@ -3,10 +3,11 @@
 """Gather all json strings from the Lessons from Luke website and convert to an ODT file.
 """
 
-import requests
-
 from pathlib import Path
 
+from lfl_download import download_lessons
+from lfl_odt import make_odt
+
 # The site is organized by language then lesson; e.g.
 # lfl_api / language / [2,5] / lessons / [1-112]
 # language 2 == French; language 5 == Sango
@@ -20,18 +21,16 @@ lessons = range(1, 113)
 
 ans = input("Download text from the website? [y/N]: ")
 if ans and ans.lower()[0] == 'y':
-    # Copy JSON files to lfl_data.
-    for language in languages:
-        for lesson in lessons:
-            outf = lfl_data / f"{language}-{lesson}-tStrings.json"
-            print(f"Downloading language {language}, lesson {lesson}...")
-            try:
-                r = requests.get(f"{lfl_api}/languages/5/lessons/1/tStrings")
-            except KeyboardInterrupt:
-                print("\nInterrupted with Ctrl-C.")
-                exit(1)
-            outf.write_text(r.text)
+    # Copy JSON files to lfl_data; unchanged lessons are skipped.
+    try:
+        download_lessons(languages, lessons, lfl_data, base_url=lfl_api)
+    except KeyboardInterrupt:
+        exit(1)
 
-data_files = [f for f in lfl_data.glob('*.json')]
-data_files.sort()
+# Lesson files as named by lfl_download, not its .lfl-download.json manifest.
+data_files = [f for f in lfl_data.glob('*-tStrings.json')]
+if not data_files:
+    print(f"Error: No JSON files in {lfl_data}")
+    exit(1)
+make_odt(data_files, outfile)
 
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+
+"""
+Download the Lessons from Luke JSON strings, several lessons at a time:
+    from lfl_download import download_lessons
+    download_lessons([5], range(1, 113), lfl_data)
+
+Lessons are fetched with a shared, connection-pooled session, and failed
+requests are retried with exponential backoff. The ETag and Last-Modified of
+each file are kept in a .lfl-download.json manifest in the output folder, so
+lessons the server reports as unchanged (304) are skipped. If the server sends
+neither, a lesson is skipped if the size the server gives for it (HEAD) is
+that of the file already downloaded. Each file is
+written to a temporary .part file and renamed when complete, and the manifest
+is saved as lessons finish, so an interrupted run resumes where it stopped.
+
+To test against a local stand-in for the API, serve a folder laid out like
+it, e.g. languages/5/lessons/1/tStrings, and pass its URL:
+    python3 -m http.server -d test-api 8000 &
+    ./lfl_download.py --url http://localhost:8000 --lessons 1-3
+"""
+
+import argparse
+import json
+import os
+import time
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import requests
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+lfl_api = "https://luke.silcameroon.org/api"
+manifest_name = '.lfl-download.json'
+
+
+def make_session(jobs, retries=3, backoff=0.5):
+    """Return a session with a connection pool big enough for all the threads
+    and automatic retries, waiting backoff * 2^n seconds before retry n."""
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=('GET',),
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=jobs, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def get_lesson_url(base_url, language, lesson):
+    return f"{base_url}/languages/{language}/lessons/{lesson}/tStrings"
+
+def get_lesson_file(outdir, language, lesson):
+    return outdir / f"{language}-{lesson}-tStrings.json"
+
+def load_manifest(outdir):
+    manifest_file = outdir / manifest_name
+    if manifest_file.is_file():
+        return json.loads(manifest_file.read_text())
+    return {}
+
+def save_manifest(outdir, manifest):
+    tmp = outdir / f"{manifest_name}.part"
+    tmp.write_text(json.dumps(manifest, indent=2))
+    os.replace(tmp, outdir / manifest_name)
+
+def fetch_file(session, url, outfile, cached=None, timeout=30):
+    """Download url to outfile unless the server says it hasn't changed.
+
+    Returns ('unchanged' or 'downloaded', manifest entry).
+    """
+    headers = {}
+    if cached and outfile.is_file():
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+        if not headers and cached.get('size') == outfile.stat().st_size:
+            # The server gave no validators last time, so compare the size it
+            # reports now with that of the file downloaded.
+            r = session.head(url, timeout=timeout)
+            if r.ok and r.headers.get('Content-Length') == str(cached['size']):
+                return 'unchanged', cached
+    r = session.get(url, headers=headers, timeout=timeout)
+    if r.status_code == 304:
+        return 'unchanged', cached
+    r.raise_for_status()
+    tmp = outfile.with_name(f"{outfile.name}.part")
+    tmp.write_bytes(r.content)
+    os.replace(tmp, outfile)
+    entry = {
+        'etag': r.headers.get('ETag'),
+        'last_modified': r.headers.get('Last-Modified'),
+        'size': len(r.content),
+    }
+    return 'downloaded', entry
+
+def download_lessons(languages, lessons, outdir, base_url=lfl_api, jobs=8, retries=3, force=False):
+    """Download the lessons' JSON strings to outdir, at most `jobs` at a time.
+
+    Returns a dict of counts of downloaded, unchanged and failed lessons.
+    """
+    outdir = Path(outdir)
+    outdir.mkdir(parents=True, exist_ok=True)
+    manifest = {} if force else load_manifest(outdir)
+    counts = {'downloaded': 0, 'unchanged': 0, 'failed': 0}
+    session = make_session(jobs, retries)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = {}
+        for language in languages:
+            for lesson in lessons:
+                outfile = get_lesson_file(outdir, language, lesson)
+                url = get_lesson_url(base_url, language, lesson)
+                future = executor.submit(fetch_file, session, url, outfile, manifest.get(outfile.name))
+                futures[future] = outfile
+        try:
+            for future in as_completed(futures):
+                outfile = futures[future]
+                try:
+                    status, entry = future.result()
+                except requests.RequestException as e:
+                    print(f"Error: {outfile.name}: {e}")
+                    counts['failed'] += 1
+                    continue
+                counts[status] += 1
+                manifest[outfile.name] = entry
+                print(f"{status}: {outfile.name}")
+                if status == 'downloaded':
+                    save_manifest(outdir, manifest)
+        except KeyboardInterrupt:
+            print("\nInterrupted with Ctrl-C; run again to resume.")
+            for future in futures:
+                future.cancel()
+            raise
+        finally:
+            save_manifest(outdir, manifest)
+    session.close()
+    elapsed = time.perf_counter() - start
+    print(
+        f"{counts['downloaded']} downloaded, {counts['unchanged']} unchanged, "
+        f"{counts['failed']} failed in {elapsed:.2f} s"
+    )
+    return counts
+
+def number_range(string):
+    # e.g. "1-112" or "3"
+    first, _, last = string.partition('-')
+    return range(int(first), int(last or first) + 1)
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument(
+        "-o", "--outdir",
+        default=Path(__file__).resolve().parent / 'lfl-data',
+        help="folder for the JSON files (default: lfl-data)",
+    )
+    p.add_argument(
+        "--url",
+        default=lfl_api,
+        help=f"base URL of the API (default: {lfl_api})",
+    )
+    p.add_argument(
+        "--languages",
+        type=lambda s: [int(n) for n in s.split(',')],
+        default=[5],
+        help="comma-separated language numbers (default: 5, Sango)",
+    )
+    p.add_argument(
+        "--lessons",
+        type=number_range,
+        default=range(1, 113),
+        help="lesson numbers, e.g. 1-112 (default)",
+    )
+    p.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=8,
+        help="number of lessons to download at the same time (default: 8)",
+    )
+    p.add_argument(
+        "-f", "--force",
+        action="store_true",
+        help="download all lessons even if they haven't changed",
+    )
+    args = p.parse_args()
+
+    try:
+        counts = download_lessons(
+            args.languages, args.lessons, args.outdir,
+            base_url=args.url, jobs=args.jobs, force=args.force,
+        )
+    except KeyboardInterrupt:
+        exit(1)
+    if counts['failed']:
+        exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Write the Lessons from Luke strings to an ODT file, one paragraph at a time:
+    from lfl_odt import iter_lessons, write_odt
+    write_odt(outfile, iter_lessons(data_files, jobs=4))
+
+Each lesson is a title and a list of (source, text) string pairs, i.e. French
+and Sango. content.xml is streamed into the zip file as it's generated, so the
+document tree is never built in memory. Lesson files are parsed in parallel
+and written in order as soon as each one is ready.
+"""
+
+import csv
+import json
+import os
+import re
+import time
+import zipfile
+
+from concurrent.futures import ProcessPoolExecutor
+from xml.sax.saxutils import escape
+
+mimetype = 'application/vnd.oasis.opendocument.text'
+manifest_xml = f"""<?xml version="1.0" encoding="UTF-8"?>
+<manifest:manifest xmlns:manifest="urn:oasis:names:tc:opendocument:xmlns:manifest:1.0" manifest:version="1.2">
+ <manifest:file-entry manifest:full-path="/" manifest:media-type="{mimetype}"/>
+ <manifest:file-entry manifest:full-path="content.xml" manifest:media-type="text/xml"/>
+ <manifest:file-entry manifest:full-path="styles.xml" manifest:media-type="text/xml"/>
+</manifest:manifest>
+"""
+namespaces = (
+    'xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0" '
+    'xmlns:style="urn:oasis:names:tc:opendocument:xmlns:style:1.0" '
+    'xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0" '
+    'xmlns:fo="urn:oasis:names:tc:opendocument:xmlns:xsl-fo-compatible:1.0" '
+    'office:version="1.2"'
+)
+styles_xml = f"""<?xml version="1.0" encoding="UTF-8"?>
+<office:document-styles {namespaces}>
+ <office:styles>
+  <style:style style:name="Standard" style:family="paragraph"/>
+  <style:style style:name="Heading_20_1" style:display-name="Heading 1" style:family="paragraph" style:parent-style-name="Standard" style:default-outline-level="1">
+   <style:paragraph-properties fo:margin-top="0.42cm" fo:margin-bottom="0.21cm" fo:break-before="page"/>
+   <style:text-properties fo:font-size="16pt" fo:font-weight="bold"/>
+  </style:style>
+  <style:style style:name="Source" style:family="paragraph" style:parent-style-name="Standard">
+   <style:paragraph-properties fo:margin-top="0.21cm"/>
+   <style:text-properties fo:font-style="italic" fo:color="#555555"/>
+  </style:style>
+  <style:style style:name="Text" style:family="paragraph" style:parent-style-name="Standard"/>
+ </office:styles>
+</office:document-styles>
+"""
+
+
+def lesson_number(path):
+    # e.g. "5-12-tStrings.json" -> (5, 12), so that lesson 2 comes before 10.
+    return tuple(int(n) for n in re.findall(r'\d+', path.stem)) or (0,)
+
+def get_pairs(data):
+    """Return the (source, text) pairs of a parsed tStrings list, or of a
+    dict holding one."""
+    if isinstance(data, dict):
+        data = next((v for v in data.values() if isinstance(v, list)), [])
+    return [(s.get('source') or '', s.get('text') or '') for s in data if isinstance(s, dict)]
+
+def read_lesson(path):
+    """Return the lesson's title and its (source, text) pairs from a JSON
+    tStrings file or a CSV file of source,text rows."""
+    if path.suffix == '.csv':
+        with open(path, newline='', encoding='utf-8') as f:
+            rows = [r for r in csv.reader(f) if r]
+        if rows and [c.lower() for c in rows[0][:2]] == ['source', 'text']:
+            rows = rows[1:]
+        pairs = [(r[0], r[1] if len(r) > 1 else '') for r in rows]
+    else:
+        with open(path, encoding='utf-8') as f:
+            pairs = get_pairs(json.load(f))
+    numbers = re.findall(r'\d+', path.stem)
+    title = f"Leçon {numbers[-1]}" if numbers else path.stem
+    return title, pairs
+
+def iter_lessons(data_files, jobs=None):
+    """Yield (title, pairs) for each JSON or CSV file, in lesson order."""
+    data_files = sorted(data_files, key=lesson_number)
+    if jobs == 1 or len(data_files) < 2:
+        yield from map(read_lesson, data_files)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        chunksize = max(len(data_files) // (4 * (jobs or os.cpu_count())), 1)
+        yield from executor.map(read_lesson, data_files, chunksize=chunksize)
+
+def format_text(text):
+    # Line breaks are kept within the paragraph.
+    return '<text:line-break/>'.join(escape(line) for line in text.split('\n'))
+
+def iter_content(lessons, langs=('source', 'text')):
+    """Yield content.xml in pieces, a paragraph at a time."""
+    yield f'<?xml version="1.0" encoding="UTF-8"?>\n<office:document-content {namespaces}>\n'
+    yield '<office:body>\n<office:text>\n'
+    for title, pairs in lessons:
+        yield f'<text:h text:style-name="Heading_20_1" text:outline-level="1">{escape(title)}</text:h>\n'
+        for source, text in pairs:
+            if 'source' in langs and source:
+                yield f'<text:p text:style-name="Source">{format_text(source)}</text:p>\n'
+            if 'text' in langs and text:
+                yield f'<text:p text:style-name="Text">{format_text(text)}</text:p>\n'
+    yield '</office:text>\n</office:body>\n</office:document-content>\n'
+
+def write_odt(outfile, lessons, langs=('source', 'text')):
+    """Write the lessons to an ODT file; returns the numbers of lessons and
+    paragraphs."""
+    lesson_ct = ct = 0
+    tmp = outfile.with_name(f"{outfile.name}.part")
+    with zipfile.ZipFile(tmp, 'w', compression=zipfile.ZIP_DEFLATED) as z:
+        # The mimetype must come first, uncompressed.
+        z.writestr(zipfile.ZipInfo('mimetype'), mimetype, compress_type=zipfile.ZIP_STORED)
+        z.writestr('META-INF/manifest.xml', manifest_xml)
+        z.writestr('styles.xml', styles_xml)
+        with z.open('content.xml', 'w') as f:
+            for piece in iter_content(lessons, langs):
+                lesson_ct += piece.startswith('<text:h')
+                ct += piece.startswith('<text:p')
+                f.write(piece.encode('utf-8'))
+    os.replace(tmp, outfile)
+    return lesson_ct, ct
+
+def make_odt(data_files, outfile, langs=('source', 'text'), jobs=None):
+    """Read the lesson files and write them to outfile, reporting the time."""
+    start = time.perf_counter()
+    lesson_ct, ct = write_odt(outfile, iter_lessons(data_files, jobs), langs)
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {lesson_ct} lessons ({ct} paragraphs) to {outfile} in {elapsed:.2f} s")
@@ -1,10 +1,17 @@
 #!/usr/bin/env python3
 
 """This script takes a URL as input and outputs an MD-formatted list of (.mp4) links from the URL:
- ["URL Title"]("URL link")"""
+ ["URL Title"]("URL link")
+
+With --depth, pages linked from the URL on the same host are crawled too, to
+the given depth, several at a time (this needs aiohttp). Each page's HTML is
+parsed as it arrives and its links are printed as soon as they're found.
+"""
 
 import argparse
-import json
+import asyncio
+import codecs
+import sys
 import urllib.parse
 import urllib.request
 
@@ -12,25 +19,28 @@ from html.parser import HTMLParser
 
 
 class Parse(HTMLParser):
-    def __init__(self, filetypes):
+    def __init__(self, filetypes, base_url):
         super().__init__()
         self.links = []
+        self.pages = [] # other links, which may be pages to crawl
         self.filetypes = filetypes
+        self.base_url = base_url
     def handle_starttag(self, tag, attrs):
         if tag == 'a':
             for name, link in attrs:
-                end = link.split('.')[-1]
-                if name == 'href' and end in self.filetypes:
-                    if link[:4] != 'http':
-                        url_out = input_url + link
-                    else:
-                        url_out = link
+                if name != 'href' or not link:
+                    continue
+                url_out = urllib.parse.urljoin(self.base_url, link)
+                end = urllib.parse.urlsplit(url_out).path.split('.')[-1].lower()
+                if end in self.filetypes:
                     self.links.append(
                         {
                             "url": url_out,
                             "title": urllib.parse.unquote(link)
                         }
                     )
+                else:
+                    self.pages.append(urllib.parse.urldefrag(url_out).url)
 
     def handle_endtag(self, tag):
         pass
@@ -51,11 +61,100 @@ def getResponse(url):
     else:
         data = None
         print("Error receiving data", operUrl.getcode())
-    return data
+    # Relative links are resolved against the final URL, after any redirect.
+    return data, operUrl.geturl()
 
 def filetype_list(string):
     return string.split(',')
 
+def format_link(link):
+    return f"[{link['title']}]({link['url']})  "
+
+
+class Crawler:
+    """Crawl pages breadth-first from a start URL, staying on its host, and
+    print the links to files of the given types found on each page."""
+
+    def __init__(self, start_url, filetypes, depth=1, jobs=8, per_host=4, timeout=30):
+        self.start_url = start_url
+        self.host = urllib.parse.urlsplit(start_url).netloc
+        self.filetypes = filetypes
+        self.depth = depth
+        self.jobs = jobs
+        self.per_host = per_host
+        self.timeout = timeout
+        self.visited = set()
+        self.found = set()
+        self.last_page = None
+        self.page_ct = 0
+
+    def emit(self, page_url, links):
+        """Print the links not already printed, under their page's heading."""
+        for link in links:
+            if link['url'] in self.found:
+                continue
+            self.found.add(link['url'])
+            if page_url != self.last_page:
+                print(f"### {page_url}")
+                self.last_page = page_url
+            print(format_link(link), flush=True)
+
+    def should_visit(self, url):
+        parts = urllib.parse.urlsplit(url)
+        return parts.scheme in ('http', 'https') and parts.netloc == self.host and url not in self.visited
+
+    async def fetch_page(self, session, url):
+        """Parse the page as it's downloaded; return the pages it links to."""
+        async with session.get(url) as r:
+            if r.status != 200 or r.content_type != 'text/html':
+                return []
+            page_url = str(r.url)
+            if url == self.start_url:
+                # Stay on the host the start URL redirects to, if it does.
+                self.host = urllib.parse.urlsplit(page_url).netloc
+                self.visited.add(page_url)
+            parser = Parse(self.filetypes, page_url)
+            decoder = codecs.getincrementaldecoder(r.charset or 'utf-8')(errors='replace')
+            async for chunk in r.content.iter_chunked(64 * 1024):
+                parser.feed(decoder.decode(chunk))
+                self.emit(page_url, parser.links)
+                parser.links.clear()
+            parser.feed(decoder.decode(b'', final=True))
+            parser.close()
+            self.emit(page_url, parser.links)
+        self.page_ct += 1
+        return parser.pages
+
+    async def worker(self, session, queue):
+        while True:
+            url, depth = await queue.get()
+            try:
+                pages = await self.fetch_page(session, url)
+                if depth < self.depth:
+                    for page in pages:
+                        if self.should_visit(page):
+                            self.visited.add(page)
+                            queue.put_nowait((page, depth + 1))
+            except Exception as e:
+                # A bad page mustn't stop the worker, or queue.join() would
+                # wait for it forever.
+                print(f"Error: {url}: {e or type(e).__name__}", file=sys.stderr)
+            finally:
+                queue.task_done()
+
+    async def run(self):
+        connector = aiohttp.TCPConnector(limit=self.jobs, limit_per_host=self.per_host)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            queue = asyncio.Queue()
+            self.visited.add(self.start_url)
+            queue.put_nowait((self.start_url, 0))
+            workers = [asyncio.create_task(self.worker(session, queue)) for i in range(self.jobs)]
+            await queue.join()
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
 
 # Define allowed arguments.
 parser = argparse.ArgumentParser(
@@ -65,10 +164,27 @@ parser = argparse.ArgumentParser(
 parser.add_argument(
     '--types',
     type=filetype_list,
-    default='mp4',
-    nargs=1,
+    default=['mp4'],
     help="Define which filetype(s) to find (default is 'mp4'). Multiple values should be separated by commas: exe,mp4"
 )
+parser.add_argument(
+    '--depth',
+    type=int,
+    default=0,
+    help="Also crawl pages on the same site up to this many links away (default is 0: only the given page)."
+)
+parser.add_argument(
+    '--jobs',
+    type=int,
+    default=8,
+    help="Number of pages to fetch at the same time when crawling (default is 8)."
+)
+parser.add_argument(
+    '--per-host',
+    type=int,
+    default=4,
+    help="Number of connections to the site at the same time when crawling (default is 4)."
+)
 parser.add_argument(
     'URL',
     help='The link to the site you wish to scrape for file downloads.'
@@ -76,18 +192,30 @@ parser.add_argument(
 
 # Parse arguments; set variables.
 args = parser.parse_args()
-types = args.types[0]
+types = args.types
 filetypes = []
 for filetype in types:
     filetypes.append(filetype.lower())
 input_url = args.URL
 
+if args.depth > 0:
+    # Crawl the site.
+    import aiohttp
+    crawler = Crawler(input_url, filetypes, depth=args.depth, jobs=args.jobs, per_host=args.per_host)
+    try:
+        asyncio.run(crawler.run())
+    except KeyboardInterrupt:
+        print("\nInterrupted with Ctrl-C.")
+        exit(1)
+    print(f"\n{len(crawler.found)} links found on {crawler.page_ct} pages.", file=sys.stderr)
+    exit()
+
 # Parse webpage.
-data = getResponse(input_url)
-p = Parse(filetypes)
+data, base_url = getResponse(input_url)
+p = Parse(filetypes, base_url)
 p.feed(data)
 
 # Create output.
 print(f"### {input_url}")
 for l in p.links:
-    print(f"[{l['title']}]({l['url']})  ")
+    print(format_link(l))
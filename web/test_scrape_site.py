@@ -0,0 +1,103 @@
+"""
+Crawl a small site served on 127.0.0.1 with scrape-site.py --depth:
+    python3 -m unittest test_scrape_site
+"""
+
+import http.server
+import subprocess
+import sys
+import threading
+import unittest
+
+from pathlib import Path
+
+script = Path(__file__).resolve().parent / 'scrape-site.py'
+
+# path: (content type, body); "{other}" is the same server under another name.
+pages = {
+    '/index.html': ('text/html', '<a href="v1.mp4">v1</a> <a href="a.html">a</a> '
+                    '<a href="bad.html">bad</a> <a href="{other}/offsite.html">off</a>'),
+    '/a.html': ('text/html', '<a href="/v2.mp4">v2</a> <a href="b.html">b</a>'),
+    '/b.html': ('text/html', '<a href="v3.mp4">v3</a> <a href="c.html">c</a>'),
+    '/c.html': ('text/html', '<a href="v4.mp4">v4</a>'),
+    '/bad.html': ('text/html; charset=no-such-charset', '<a href="v5.mp4">v5</a>'),
+    '/offsite.html': ('text/html', '<a href="v6.mp4">v6</a>'),
+}
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append((self.headers['Host'].split(':')[0], self.path))
+        if self.path == '/start':
+            # Redirect to another host name, which becomes the site's host.
+            self.send_response(302)
+            self.send_header('Location', f"http://127.0.0.1:{self.server.server_port}/index.html")
+            self.end_headers()
+            return
+        if self.path not in pages:
+            self.send_error(404)
+            return
+        content_type, body = pages[self.path]
+        body = body.replace('{other}', f"http://localhost:{self.server.server_port}").encode()
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class CrawlTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        try:
+            import aiohttp
+        except ImportError:
+            raise unittest.SkipTest("aiohttp isn't installed")
+        cls.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        cls.server.requests = []
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.requests.clear()
+
+    def crawl(self, depth):
+        url = f"http://localhost:{self.server.server_port}/start"
+        r = subprocess.run(
+            [sys.executable, str(script), '--depth', str(depth), url],
+            capture_output=True, text=True, timeout=30,
+        )
+        self.assertEqual(r.returncode, 0, r.stderr)
+        return r
+
+    def test_follows_links_to_depth(self):
+        out = self.crawl(2).stdout
+        for name in ('v1', 'v2', 'v3'):
+            self.assertIn(f"/{name}.mp4", out)
+        # c.html is 3 links away.
+        self.assertNotIn('/v4.mp4', out)
+        self.assertNotIn(('127.0.0.1', '/c.html'), self.server.requests)
+
+    def test_stays_on_host_after_redirect(self):
+        out = self.crawl(3).stdout
+        self.assertIn('/v4.mp4', out)
+        # The start URL redirects from localhost to 127.0.0.1, so a link back
+        # to localhost is off-site.
+        self.assertNotIn(('localhost', '/offsite.html'), self.server.requests)
+        self.assertNotIn('/v6.mp4', out)
+
+    def test_bad_page_is_reported_and_skipped(self):
+        r = self.crawl(1)
+        self.assertIn('bad.html', r.stderr)
+        self.assertIn('/v2.mp4', r.stdout)
+
+
+if __name__ == '__main__':
+    unittest.main()